@@ -8,15 +8,52 @@ LICENSE file in the root directory) and Apache 2.0 License
 (found in the LICENSE.Apache file in the root directory).
 """
 
-from .version import *
-__version__ = PROJECT_VERSION
-
+__author__ = 'Adriano Lange <alange0001@gmail.com>'
 __all__ = [
- 	'PROJECT_NAME', 'PROJECT_VERSION', 'DOCKER_IMAGE',
+	'PROJECT_NAME', 'PROJECT_VERSION', 'DOCKER_IMAGE',
 	'util', 'plot', 'run'
 ]
-__author__ = 'Adriano Lange <alange0001@gmail.com>'
 
-from . import util
-from . import plot
-from . import run
+from .version import (PROJECT_NAME, PROJECT_VERSION, DOCKER_ACCOUNT, DOCKER_IMAGE,
+                      COMMUNICATION_DIR, NOTEBOOK_URL_FILE)
+__version__ = PROJECT_VERSION
+
+import importlib
+import importlib.util
+import sys
+import typing
+
+if typing.TYPE_CHECKING:
+	from . import util, plot, run
+
+_LAZY = {'util', 'plot', 'run'}
+
+def _lazy_module(fullname):
+	# plot pulls matplotlib/seaborn/pandas, so its body only runs when one of
+	# its attributes is read, not when the module object is first handed out.
+	spec = importlib.util.find_spec(fullname)
+	loader = importlib.util.LazyLoader(spec.loader)
+	spec.loader = loader
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[fullname] = module
+	loader.exec_module(module)
+	return module
+
+def __getattr__(name):
+	if name in _LAZY:
+		fullname = f'{__name__}.{name}'
+		if fullname in sys.modules:
+			mod = sys.modules[fullname]
+		elif name == 'plot':
+			mod = _lazy_module(fullname)
+		else:
+			mod = importlib.import_module(f'.{name}', __name__)
+		# Keep this write to globals(): once the submodule is bound in the
+		# package namespace, later lookups of storiks.<name> are plain dict
+		# hits and no longer go through this __getattr__.
+		globals()[name] = mod
+		return mod
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__():
+	return sorted(set(globals()) | _LAZY)
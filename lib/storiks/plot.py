@@ -12,29 +12,111 @@ LICENSE.GPLv2 file in the root directory) and Apache 2.0 License
 """
 
 import os
+import io
 import math
 import collections
+import colorsys
+import concurrent.futures
+import functools
+import itertools
 import re
 import sys
 import threading
-import IPython
 import random
 import time
 import traceback
 import json
 import copy
+import pickle
+import hashlib
 import sqlite3
+import importlib
 import numpy
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-from matplotlib.ticker import (AutoMinorLocator, MultipleLocator)
-from mpl_toolkits.axes_grid1 import host_subplot
 import pandas as pd
-import seaborn as sns
-sns.set()
-sns.set_style('white')
+
+from .version import PROJECT_VERSION
+from .util import coalesce, get_recursive, env_as_bool
+
+
+class _LazyModule:
+	"""Module imported on its first attribute access.
+
+	The plotting libraries take most of the import time of this module and
+	are not needed to load experiment data.
+	"""
+	def __init__(self, name, after_import=None):
+		self._name = name
+		self._after_import = after_import
+		self._module = None
+
+	def __getattr__(self, attr):
+		if self._module is None:
+			module = importlib.import_module(self._name)
+			if self._after_import is not None:
+				self._after_import()
+			self._module = module
+		return getattr(self._module, attr)
+
+
+_plot_setup_done = False
+def _plot_setup():
+	global _plot_setup_done
+	if not _plot_setup_done:
+		_plot_setup_done = True
+		if env_as_bool('STORIKS_HEADLESS'):
+			mpl.use('Agg')
+		sns.set()
+		sns.set_style('white')
+
+
+def _use_batch_backend():
+	"""Render with Agg in batch scripts that save their figures, unless a backend was requested."""
+	interactive = hasattr(sys, 'ps1') or sys.flags.interactive or 'IPython' in sys.modules
+	if interactive or os.environ.get('MPLBACKEND') is not None:
+		return
+	pyplot = sys.modules.get('matplotlib.pyplot')
+	if pyplot is None or len(pyplot.get_fignums()) == 0:  # switching backends closes open figures
+		mpl.use('Agg')
+
+
+mpl     = _LazyModule('matplotlib')
+plt     = _LazyModule('matplotlib.pyplot', _plot_setup)
+mticker = _LazyModule('matplotlib.ticker')
+sns     = _LazyModule('seaborn', _plot_setup)
+IPython = _LazyModule('IPython')
+
+try:
+	import orjson
+
+	def _json_loads(value):
+		try:
+			return orjson.loads(value)
+		except orjson.JSONDecodeError:
+			return json.loads(value)  # e.g., NaN/Infinity are only accepted by the json module
+except ImportError:
+	_json_loads = json.loads
+
+try:
+	from numba import njit
+except ImportError:
+	njit = None
+
+_NON_GUI_BACKENDS = frozenset(['agg', 'pdf', 'ps', 'svg', 'cairo', 'pgf', 'template'])
+_RASTER_FORMATS = frozenset(['png', 'jpg', 'jpeg', 'tif', 'tiff', 'webp', 'raw', 'rgba'])
+_RE_ARGS = re.compile(r'Args\.([^:]+): *(.+)')
+_RE_TASK_STATS = re.compile(r'Task ([^,]+), STATS: (.+)')
+_RE_DBBENCH_CMD = re.compile(r'Executing *db_bench\[([0-9]+)\]. *Command:')
+_RE_DBPARAM_Q = re.compile(r'\s*([^=]+)="([^"]+)"')
+_RE_DBPARAM = re.compile(r'\s*([^=]+)=([^ ]+)')
+_RE_OUT_FILENAME = re.compile(r'(.*)(\.out)(\.gz|\.lzma|\.xz)?$')
+_RE_TIME_SUFFIX = re.compile(r'\.time$')
+_RE_DECIMAL_SUFFIX = re.compile(r' *([0-9.]+) *([TBMK]) *')
+_RE_BINARY_SUFFIX = re.compile(r' *([0-9.]+) *([PTGMKptgmk])i{0,1}[Bb]{0,1} *')
+_DECIMAL_SUFFIXES = {'K': 1000, 'M': 1000**2, 'B': 1000**3, 'T': 1000**4}
+_BINARY_SUFFIXES = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4, 'P': 1024**5}
+_RE_LSM_COLUMN = re.compile(r'^(?P<c>.+?)\.socket_report\.rocksdb\.cfstats\.compaction\.L(?P<l>[0-9]+)\.(?P<s>[^.]+)$')
 
 
 class Options:
@@ -78,6 +160,8 @@ class Options:
 	args_pairgrid = dict()
 	plot_pairgrid_kv = True
 	args_pairgrid_kv = dict()
+	pairgrid_large_rows = 10000  # above this, pair grids rasterize scatter plots; None = never
+	pairgrid_kde_rows = 5000  # above this, graph_pairgrid_kv replaces KDEs by 2D histograms; None = never
 	plot_ecdf_grid = True
 	use_at3_counters = True
 	at3_ticks = True
@@ -95,6 +179,12 @@ class Options:
 	plot_all_dbmean = True
 	plot_all_pressure = True
 	plot_all_io_w = False
+	pressure_max_annotations = 50  # label at most this many points per line in the pressure graphs
+	max_graph_points = 2000  # downsample (LTTB) longer time series in the line graphs over time; None or 0 = off
+	file_workers = 1  # plotFiles without AllFiles: parse and plot the files in this many processes (requires save=True)
+	single_pdf = False  # save: collect the PDF figures of File.graph_all and AllFiles.graph_all into one multi-page file ({name}_graphs.pdf)
+	pdf_pages = None  # open PdfPages receiving the PDF figures (set by graph_all when single_pdf is enabled)
+	cache_pd_data = False  # keep pd_data and pd_data_exp in .parquet files (requires pyarrow or fastparquet)
 	_file_label = None
 	@property
 	def file_label(self):
@@ -112,6 +202,13 @@ class Options:
 		cp._process_args(kargs)
 		return cp
 
+	_valid_keys_cache = None
+	@classmethod
+	def _valid_keys(cls) -> frozenset:
+		if cls.__dict__.get('_valid_keys_cache') is None:
+			cls._valid_keys_cache = frozenset(dir(cls))
+		return cls._valid_keys_cache
+
 	def _process_args(self, args: dict) -> None:
 		deprecated = {
 			'file_start_time': 'this parameter is no longer supported',
@@ -122,18 +219,21 @@ class Options:
 			'all_pressure_label': 'use file_label',
 			'file_description': 'this parameter is no longer supported'
 		}
+		valid_keys = self._valid_keys()
 		for k, v in args.items():
 			if k == 'plot_nothing':
 				if v:
-					for i in dir(self):
+					for i in valid_keys:
 						if 'plot_' in i:
 							self.__setattr__(i, False)
-			elif k in dir(self):
-				if k in deprecated.keys():
+			elif k in valid_keys:
+				if k in deprecated:
 					raise Exception(f'Option {k} is DEPRECATED: {deprecated[k]}')
 				self.__setattr__(k, v)
 			else:
 				raise Exception('Invalid option name: {}'.format(k))
+		if args.get('save'):
+			_use_batch_backend()
 
 
 class DBClass:
@@ -142,14 +242,17 @@ class DBClass:
 
 	def __init__(self):
 		cur = self.conn.cursor()
+		# in-memory database: nothing to be preserved on crashes
+		for pragma in ['page_size = 4096', 'journal_mode = MEMORY', 'synchronous = OFF', 'temp_store = MEMORY']:
+			cur.execute(f'PRAGMA {pragma}')
 		cur.execute('''CREATE TABLE files (
 			  file_id INT PRIMARY KEY, name TEXT,
-			  number INT)''')
+			  number INT) WITHOUT ROWID''')
 		cur.execute('''CREATE TABLE data (
 			file_id INT, number INT, time INT,
 			block_size INT, random_ratio DOUBLE, write_ratio DOUBLE,
 			mbps DOUBLE, mbps_read DOUBLE, mbps_write DOUBLE, blocks_ps DOUBLE,
-			PRIMARY KEY(file_id, number, time))''')
+			PRIMARY KEY(file_id, number, time)) WITHOUT ROWID''')
 		self.conn.commit()
 
 	def getFileId(self):
@@ -160,10 +263,15 @@ class DBClass:
 	def getCursor(self):
 		return self.conn.cursor()
 
-	def query(self, sql, printsql=False):
+	def execute(self, sql, params=()):
+		# sqlite3 keeps its own per-connection cache of compiled statements,
+		# keyed by the SQL text: pass values as ? parameters, not formatted in
+		return self.conn.execute(sql, params)
+
+	def query(self, sql, printsql=False, params=()):
 		if printsql:
 			print('SQL: ' + sql)
-		return self.conn.cursor().execute(sql)
+		return self.execute(sql, params)
 
 	def commit(self):
 		self.conn.commit()
@@ -251,6 +359,16 @@ class AllFiles:
 			self._file_objs[i].graph_all()
 
 		print('AllFiles Graphs:')
+		options = self._options
+		self._options = pdf_pages_options(options, self._filename)
+		try:
+			self._graph_all()
+		finally:
+			if self._options is not options:
+				self._options.pdf_pages.close()
+				self._options = options
+
+	def _graph_all(self):
 		if self._options.plot_all_ecdf:
 			self.graph_ecdf()
 		if self._options.plot_all_dbmean:
@@ -285,11 +403,7 @@ class AllFiles:
 		ax.grid(which='major', color='#888888', linestyle='--')
 		ax.legend(loc='upper left', ncol=1, frameon=True, bbox_to_anchor=(1.02, 1.), borderaxespad=0)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}_graph_ecdf.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}_graph_ecdf', self._options)
 
 	def graph_dbmean(self):
 		pressures = self.file_pressures
@@ -321,11 +435,7 @@ class AllFiles:
 		ax.set(xlabel="concurrent workloads", ylabel="kv:ops/s")
 		ax.legend(loc='upper left', ncol=1, frameon=True, bbox_to_anchor=(1.02, 1.), borderaxespad=0)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}_graph_db.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}_graph_db', self._options)
 
 	_file_pressures = None
 	@property
@@ -383,14 +493,14 @@ class AllFiles:
 		i_ax = 0
 		for data in filter(lambda x: x is not None, pressures):
 			line_label = data['file_label']
-			X = data['W_normalized']
+			X = numpy.asarray(data['W_normalized'])
 			X_labels = data['W_names']
 			Y_labels.append(line_label)
 
-			for i in range(len(X)):
+			for i in annotation_indices(len(X), self._options.pressure_max_annotations):
 				ax.annotate(f'{X_labels[i]}', xy=(X[i], i_ax), xytext=(X[i] - 0.007, i_ax + 0.2), rotation=90)
 
-			ax.plot(X, [i_ax for x in X], 'o', color=colors[0])
+			ax.plot(X, numpy.full(len(X), i_ax), 'o', color=colors[0])
 			Y_ticks.append(i_ax)
 			i_ax -= 1
 
@@ -399,18 +509,14 @@ class AllFiles:
 		ax.yaxis.set_ticks(Y_ticks)
 		ax.yaxis.set_ticklabels(Y_labels)
 
-		ax.xaxis.set_major_locator(MultipleLocator(0.1))
-		ax.xaxis.set_minor_locator(AutoMinorLocator(4))
+		ax.xaxis.set_major_locator(mticker.MultipleLocator(0.1))
+		ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(4))
 		ax.grid(which='major', color='#888888', linestyle='--')
 		ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
 		ax.set(xlabel="normalized pressure: $(\\rho(w_0)-\\rho(w_i)) / \\rho(w_0)$")
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}-pressure.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}-pressure', self._options)
 
 	def graph_join_pressure(self, **args) -> None:
 		pressures = list(filter(
@@ -445,7 +551,7 @@ class AllFiles:
 			min_list0.append(X0.min())
 			min_list1.append(X1.min())
 
-			for i in range(len(X1)):
+			for i in annotation_indices(len(X1), self._options.pressure_max_annotations):
 				if X1[i] is not None:
 					axs[1].annotate(f'{X_labels[i]}', xy=(X1[i], i_ax), xytext=(X1[i] - 0.007, i_ax + 0.2), rotation=90)
 				if X0[i] is not None:
@@ -468,8 +574,8 @@ class AllFiles:
 			ax.set_ylim([i_ax + 0.8, 0.7])
 			ax.yaxis.set_ticks(Y_ticks)
 
-			ax.xaxis.set_major_locator(MultipleLocator(0.1))
-			ax.xaxis.set_minor_locator(AutoMinorLocator(4))
+			ax.xaxis.set_major_locator(mticker.MultipleLocator(0.1))
+			ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(4))
 			ax.grid(which='major', color='#888888', linestyle='--')
 			ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
@@ -478,11 +584,7 @@ class AllFiles:
 		axs[0].set(xlabel=coalesce(args.get('xlabel_left'), "normalized pressure"))
 		axs[1].set(xlabel=coalesce(args.get('xlabel_right'), "normalized pressure"))
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}-pressure.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}-pressure', self._options)
 
 	def graph_join_pressure_bar(self, **args) -> None:
 		pressures = list(filter(
@@ -521,7 +623,7 @@ class AllFiles:
 			ax.yaxis.set_tick_params(which='major', reset=True)
 			ax.grid(which='major', color='#888888', linestyle='--')
 			ax.grid(which='minor', color='#CCCCCC', linestyle=':')
-			ax.yaxis.set_minor_locator(AutoMinorLocator(4))
+			ax.yaxis.set_minor_locator(mticker.AutoMinorLocator(4))
 			ax.xaxis.grid(visible=False)
 
 		g.fig.axes[0].set(title=coalesce(args.get('title_kv'), 'Interference on KV-store'))
@@ -529,9 +631,7 @@ class AllFiles:
 
 		fig = g.fig
 		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}-pressure_bar.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
+			save_figure(fig, f'{self._filename}-pressure_bar', self._options.formats)
 		if coalesce(args.get('show'), True) is True:
 			plt.show()
 		return g
@@ -589,11 +689,7 @@ class AllFiles:
 		ax.set(xlabel="concurrent workloads", ylabel="disk:MiB/s")
 		ax.legend(loc='upper left', ncol=1, frameon=True, bbox_to_anchor=(1.02, 1.), borderaxespad=0)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}-io_w.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}-io_w', self._options)
 
 	def graph_io_w_bar(self):
 		dfaux = self.pd_io_w
@@ -611,11 +707,7 @@ class AllFiles:
 		ax.set(xlabel="concurrent workloads", ylabel="disk:MiB/s")
 		ax.legend(loc='upper left', ncol=1, frameon=True, bbox_to_anchor=(1.02, 1.), borderaxespad=0)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename}-io_w_bar.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename}-io_w_bar', self._options)
 
 
 class File:
@@ -668,14 +760,13 @@ class File:
 		self._data = dict()
 		self._dbbench = list()
 		self._plotdata = collections.OrderedDict()
-		self.get_dbbench_params()
 		self.load_data()
 
 	@classmethod
 	def decompose_filename(cls, filename: str) -> list:
-		r = re.findall(r'(.*)(\.out)(\.gz|\.lzma|\.xz)?$', filename)
-		if len(r) > 0:
-			return list(r[0])
+		m = _RE_OUT_FILENAME.match(filename)
+		if m:
+			return [coalesce(g, '') for g in m.groups()]
 		return []
 
 	@classmethod
@@ -684,13 +775,16 @@ class File:
 
 	def open_file(self):
 		d = self.__class__.decompose_filename(self._filename)
+		buffer_size = 1 << 20
 		if len(d) > 2 and d[2] == '.gz':
 			import gzip
-			return gzip.open(self._filename, 'rt')
-		if len(d) > 2 and d[2] in ['.lzma', '.xz']:
+			raw = gzip.open(self._filename, 'rb')
+		elif len(d) > 2 and d[2] in ['.lzma', '.xz']:
 			import lzma
-			return lzma.open(self._filename, 'rt')
-		return open(self._filename, 'rt')
+			raw = lzma.open(self._filename, 'rb')
+		else:
+			return open(self._filename, 'rt', encoding='utf-8', buffering=buffer_size)
+		return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=buffer_size), encoding='utf-8')
 
 	_filename_without_ext_cache = None
 	@property
@@ -701,29 +795,59 @@ class File:
 		return self._filename_without_ext_cache
 
 	def load_data(self):
+		num_dbs = 0
+		cur_db = -1
+		in_dbbench_cmd = False  # parsing the parameters of the command of db_bench[cur_db]
 		with self.open_file() as file:
 			line_count = 0
 			try:
 				for line in file:
 					line_count += 1
-					parsed_line = re.findall(r'Args\.([^:]+): *(.+)', line)
-					if len(parsed_line) > 0:
-						self._params[parsed_line[0][0]] = try_convert(parsed_line[0][1], int, float)
+					if in_dbbench_cmd:
+						if line.startswith('['):  # end of the command
+							in_dbbench_cmd = False
+						else:
+							for l2 in line.split("--"):  # parameters
+								m = _RE_DBPARAM_Q.search(l2)
+								if m:
+									self._dbbench[cur_db][m.group(1)] = try_convert(m.group(2), int, float)
+									continue
+								m = _RE_DBPARAM.search(l2)
+								if m:
+									self._dbbench[cur_db][m.group(1)] = try_convert(m.group(2), int, float)
+									continue
+							continue
 
-					parsed_line = re.findall(r'Task ([^,]+), STATS: (.+)', line)
-					if len(parsed_line) > 0:
-						task = parsed_line[0][0]
+					m = _RE_ARGS.search(line)
+					if m:
+						self._params[m.group(1)] = try_convert(m.group(2), int, float)
+						if m.group(1) == 'num_dbs' and num_dbs == 0:  # number of DBs
+							num_dbs = int(self._params['num_dbs'])
+							for i in range(0, num_dbs):
+								self._dbbench.append(collections.OrderedDict())
+						continue
+
+					m = _RE_TASK_STATS.search(line)
+					if m:
+						task = m.group(1)
 						try:
-							data = json.loads(parsed_line[0][1])
+							data = _json_loads(m.group(2))
 						except:
-							print("json exception (task {}): {}".format(task, parsed_line[0][1]))
+							print("json exception (task {}): {}".format(task, m.group(2)))
 						# print("Task {}, data: {}".format(task, data))
 						if self._data.get(task) is None:
 							self._data[task] = []
 						data_dict = collections.OrderedDict()
 						self._data[task].append(data_dict)
 						for k, v in data.items():
-							data_dict[k] = try_convert(v, int, float, decimal_suffix)
+							data_dict[k] = _convert_stats_str(v) if isinstance(v, str) else try_convert(v, int, float, decimal_suffix)
+						continue
+
+					if num_dbs > 0:
+						m = _RE_DBBENCH_CMD.search(line)  # command of DB [i]
+						if m:
+							cur_db = int(m.group(1))
+							in_dbbench_cmd = 0 <= cur_db < num_dbs
 			except EOFError as e:
 				print(f'WARN: EOFError exception at line {line_count}: {str(e)}')
 
@@ -737,41 +861,6 @@ class File:
 		if self._num_at > 0:
 			self._at_direct_io = (self._params['at_params[0]'].find('--direct_io') >= 0)
 
-	def get_dbbench_params(self):
-		num_dbs = 0
-		cur_db = -1
-		with self.open_file() as file:
-			line_count = 0
-			try:
-				for line in file:
-					line_count += 1
-					if num_dbs == 0:
-						parsed_line = re.findall(r'Args\.num_dbs: *([0-9]+)', line)  # number of DBs
-						if len(parsed_line) > 0:
-							num_dbs = int(parsed_line[0][0])
-							for i in range(0, num_dbs):
-								self._dbbench.append(collections.OrderedDict())
-						continue
-					parsed_line = re.findall(r'Executing *db_bench\[([0-9]+)\]. *Command:', line)  # command of DB [i]
-					if len(parsed_line) > 0:
-						cur_db = int(parsed_line[0][0])
-						continue
-					parsed_line = re.findall(r'^\[.*', line) # end of the command
-					if len(parsed_line) > 0:
-						if cur_db == num_dbs -1: break
-						else: continue
-					for l2 in line.split("--"): # parameters
-						parsed_line = re.findall(r'\s*([^=]+)="([^"]+)"', l2)
-						if len(parsed_line) > 0:
-							self._dbbench[cur_db][parsed_line[0][0]] = try_convert(parsed_line[0][1], int, float)
-							continue
-						parsed_line = re.findall(r'\s*([^=]+)=([^ ]+)', l2)
-						if len(parsed_line) > 0:
-							self._dbbench[cur_db][parsed_line[0][0]] = try_convert(parsed_line[0][1], int, float)
-							continue
-			except EOFError as e:
-				print(f'WARN: EOFError exception at line {line_count}: {str(e)}')
-
 	def print_params(self):
 		print('Params:')
 		max_l = max([len(x) for x in self._params.keys()]) if len(self._params) > 0 else 20
@@ -801,23 +890,18 @@ class File:
 		self._file_id = file_id
 		num_at = self._num_at
 
-		DB.query("insert into files values ({}, '{}', {})".format(file_id, self._filename, num_at))
-		for i in range(0, num_at):
-			for j in self._data['access_time3[{}]'.format(i)]:
-				values = collections.OrderedDict()
-				values['file_id']      = file_id
-				values['number']       = i
-				values['time']         = j['time']
-				values['block_size']   = j['block_size']
-				values['random_ratio'] = j['random_ratio']
-				values['write_ratio']  = j['write_ratio']
-				values['mbps']         = j['total_MiB/s']
-				values['mbps_read']    = j['read_MiB/s']
-				values['mbps_write']   = j['write_MiB/s']
-				values['blocks_ps']    = j['blocks/s'] if j.get('blocks/s') is not None else 'NULL'
-				query = "insert into data (" + ', '.join(values.keys()) + ") values ({" + '}, {'.join(values.keys()) + "})"
-				DB.query(query.format(**values))
-		DB.commit()
+		rows = [(file_id, i, j['time'], j['block_size'], j['random_ratio'], j['write_ratio'],
+		         j['total_MiB/s'], j['read_MiB/s'], j['write_MiB/s'], j.get('blocks/s'))
+		        for i in range(0, num_at)
+		        for j in self._data[f'access_time3[{i}]']]
+
+		with DB.conn:  # one transaction, rolled back if any insert fails
+			cur = DB.getCursor()
+			cur.execute('insert into files values (?, ?, ?)', (file_id, self._filename, num_at))
+			cur.executemany('''insert into data (
+				file_id, number, time, block_size, random_ratio, write_ratio,
+				mbps, mbps_read, mbps_write, blocks_ps)
+				values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
 
 	def save_plot_data(self, name, data):
 		if self._options.savePlotData:
@@ -840,21 +924,31 @@ class File:
 			self._time_max = tmax
 		return self._time_max
 
-	_at3_changes = None
+	_at3_changes_df = None
 	@property
-	def at3_changes(self):
-		if self._at3_changes is None:
-			self._at3_changes = []
-			count_at3 = self._num_at
-			for i in range(0, count_at3):
-				i_at = collections.OrderedDict()
-				self._at3_changes.append(i_at)
+	def at3_changes_df(self):
+		"""Configuration changes of all access_time3 instances, sorted by time."""
+		if self._at3_changes_df is None:
+			rows = []
+			for i in range(0, self._num_at):
 				last_conf = None
 				for j_at in self._data.get(f'access_time3[{i}]'):
 					j_at_v = (j_at['wait'], j_at['random_ratio'], j_at['write_ratio'], j_at['iodepth'])
 					if j_at_v != last_conf:
 						last_conf = j_at_v
-						i_at[j_at['time']] = j_at_v
+						rows.append((i, j_at['time']) + j_at_v)
+			df = pd.DataFrame(rows, columns=['at_idx', 'time', 'wait', 'rr', 'wr', 'iod'])
+			self._at3_changes_df = df.sort_values(['time', 'at_idx'], kind='stable', ignore_index=True)
+		return self._at3_changes_df
+
+	_at3_changes = None
+	@property
+	def at3_changes(self):
+		if self._at3_changes is None:
+			self._at3_changes = [collections.OrderedDict() for i in range(0, self._num_at)]
+			df = self.at3_changes_df.sort_values('at_idx', kind='stable')
+			for i, time, conf in zip(df['at_idx'], df['time'], zip(df['wait'], df['rr'], df['wr'], df['iod'])):
+				self._at3_changes[i][time] = conf
 			# print('\nDEBUG: at3_changes:')
 			# for i in self._at3_changes:
 			# 	print(i)
@@ -867,21 +961,18 @@ class File:
 			fuzzy = 15
 			ret = collections.OrderedDict()
 
-			aux_times = dict()
-			for i in range(0, len(self.at3_changes)):
-				for time, conf in self.at3_changes[i].items():
-					if aux_times.get(time) is None:
-						aux_times[time] = []
-					aux_times[time].append((i, conf))
-			times = list(aux_times.keys())
-			times.sort()
+			df = self.at3_changes_df
+			times = df['time'].to_numpy()
+			changes = list(zip(df['at_idx'], zip(df['wait'], df['rr'], df['wr'], df['iod'])))
 
 			w_labels = self._options.w_labels if isinstance(self._options.w_labels, list) else []
 
 			i = 0
 			wc = 0
 			while i < len(times):
-				i_time = times[i]
+				i_time = times[i].item()
+				# the window holds all times up to i_time + fuzzy
+				i_end = int(numpy.searchsorted(times, i_time + fuzzy, side='right'))
 				ret_wc = collections.OrderedDict()
 				if i_time > fuzzy:
 					ret_wc['time'] = i_time
@@ -890,16 +981,10 @@ class File:
 				wname = f'w{wc}' if wc >= len(w_labels) else w_labels[wc]
 				ret_wc['name'] = wname
 				ret_wc['number'] = wc
-				for i_at in aux_times[i_time]:
-					ret_wc[i_at[0]] = i_at[1]
+				for i_at, conf in changes[i:i_end]:
+					ret_wc[i_at] = conf
 				ret[wname] = ret_wc
-				for j in range(i+1, len(times)):
-					if times[j] > i_time + fuzzy:
-						break
-					i += 1
-					for i_at in aux_times[times[j]]:
-						ret_wc[i_at[0]] = i_at[1]
-				i += 1
+				i = i_end
 				wc += 1
 
 			self._w_list = ret
@@ -929,13 +1014,13 @@ class File:
 			key = 'w_name'
 
 		if key is not None:
-			if key in self.pd_data.keys():
+			if key in self.pd_data_columns:
 				df1 = self.pd_data
 				if x_min is not None:
 					df1 = df1.loc[df1['time_min'] >= x_min]
 				if x_max is not None:
 					df1 = df1.loc[df1['time_min'] <= x_max]
-				df = df1.groupby([key]).agg({'time_min': 'min'}).sort_values('time_min')
+				df = df1.groupby([key], observed=True).agg({'time_min': 'min'}).sort_values('time_min')
 				x2_ticks = [i[0] for i in df.values]
 				x2_labels = [i for i in df.index]
 
@@ -956,12 +1041,19 @@ class File:
 		return None
 
 	def get_mean(self, X, Y, interval):
-		pd1 = pd.DataFrame({
-			'X': [(int(x/interval)*interval)+(interval/2) for x in X],
-			'Y': Y,
-			})
-		pd2 = pd1.groupby(['X']).agg({'Y':'mean'}).sort_values('X')
-		return list(pd2.index), list(pd2['Y'])
+		if len(X) == 0:
+			return [], []
+		bins = numpy.trunc(numpy.asarray(X, dtype=numpy.float64) / interval).astype(numpy.int64)
+		Y = numpy.asarray(Y, dtype=numpy.float64)
+		bin_min = bins.min()
+		bins -= bin_min
+		present = numpy.bincount(bins) > 0
+		valid = ~numpy.isnan(Y)
+		sums   = numpy.bincount(bins[valid], weights=Y[valid], minlength=len(present))
+		counts = numpy.bincount(bins[valid], minlength=len(present))
+		means = numpy.divide(sums, counts, out=numpy.full(len(sums), numpy.nan), where=counts > 0)
+		X_mean = (numpy.nonzero(present)[0] + bin_min) * interval + (interval / 2)
+		return X_mean.tolist(), means[present].tolist()
 
 	def overlap_args(self, *args_list):
 		args = copy.copy(self._options.args_global)
@@ -970,6 +1062,35 @@ class File:
 				args[k] = v
 		return args
 
+	_ndcache = None
+	def _ndrec(self, name):
+		"""self.data[name] (list of samples) as a DataFrame, built once per name."""
+		if self._ndcache is None: self._ndcache = dict()
+		rec = self._ndcache.get(name)
+		if rec is None:
+			rec = pd.DataFrame.from_records(self._data[name])
+			self._ndcache[name] = rec
+		return rec
+
+	_time_min_cache = None
+	def _time_min(self, name):
+		"""Sample times of self.data[name] in minutes (read-only array), built once per name."""
+		if self._time_min_cache is None: self._time_min_cache = dict()
+		X = self._time_min_cache.get(name)
+		if X is None:
+			samples = self._data[name]
+			X = numpy.fromiter((i['time'] for i in samples), dtype=numpy.float64, count=len(samples)) / 60.0
+			X.flags.writeable = False
+			self._time_min_cache[name] = X
+		return X
+
+	@staticmethod
+	def _at3_running(rec, col):
+		"""Column col of an access_time3 record frame, NaN while the instance was waiting."""
+		if col not in rec.keys():
+			return numpy.full(len(rec), numpy.nan)
+		return numpy.where(rec['wait'] == 'false', rec[col].to_numpy(dtype=numpy.float64), numpy.nan)
+
 	_pd_data_exp = None
 	def pd_data_exp(self, name):
 		if self._pd_data_exp is None: self._pd_data_exp = dict()
@@ -977,19 +1098,19 @@ class File:
 			if name not in self._data.keys() or not isinstance(self._data[name], list):
 				print(f'ERROR: invalid experiment data "{name}" or not found')
 				return None
-
-			datatrasposed = collections.OrderedDict()
-			for i in range(len(self._data[name])):
-				for k, v in flat_dict(self._data[name][i]).items():
-					if k not in datatrasposed.keys():
-						datatrasposed[k] = [None for _ in range(i)]
-					datatrasposed[k].append(self._pd_data_convert(k, v))
-
-			maxlen = max([len(i) for i in datatrasposed.values()])
-			for v in datatrasposed.values():
-				while len(v) < maxlen: v.append(None)
-
-			df = pd.DataFrame(datatrasposed)
+			df = self._cache_read('pd_data_exp', name)
+			if df is not None:
+				self._pd_data_exp[name] = df
+				return df.copy()
+
+			# one flattened row per sample, then one full-length column per key: a key missing
+			# from a sample is None in that row (values stay aligned with their own 'time')
+			rows = [flat_dict(i) for i in self._data[name]]
+			convert = self._pd_data_convert
+			datatrasposed = {k: [convert(k, r.get(k)) for r in rows]
+			                 for k in dict.fromkeys(k for r in rows for k in r)}
+
+			df = pd.DataFrame(datatrasposed, copy=False)
 			timemax = self.time_max
 			if timemax is not None:
 				df = df[df['time'] <= timemax]
@@ -1004,6 +1125,7 @@ class File:
 					df.loc[df['time'] >= w['time'], 'w_count'] = w['number']
 
 			self._pd_data_exp[name] = df.copy()
+			self._cache_write(df, 'pd_data_exp', name)
 			return df
 		else:
 			return self._pd_data_exp[name]
@@ -1013,6 +1135,9 @@ class File:
 	def pd_data(self):
 		if self._pd_data is not None:
 			return self._pd_data
+		self._pd_data = self._cache_read('pd_data')
+		if self._pd_data is not None:
+			return self._after_pd_data()
 
 		primary_exp = None
 		for i in ['ycsb[0]', 'db_bench[0]', 'access_time3[0]', 'performancemonitor']:
@@ -1023,10 +1148,13 @@ class File:
 		if len(self._data[primary_exp]) < 2: return None
 
 		primary_df = self.pd_data_exp(primary_exp)
-		primary_times = set(primary_df['time'])
+		primary_times = numpy.unique(primary_df['time'].to_numpy())
 		primary_time_range = int(round((max(primary_times) - min(primary_times))/len(primary_times)))
 		primary_df = primary_df.rename(columns=
 				dict((k, f'{primary_exp}.{k}') for k in filter(lambda x: x != 'time', primary_df.keys())))
+		primary_columns = list(primary_df.keys())
+		primary_time_dtype = primary_df['time'].dtype
+		primary_df = primary_df.set_index('time')
 
 		for sec_exp in self._data.keys():
 			if sec_exp == primary_exp: continue
@@ -1034,7 +1162,12 @@ class File:
 			if sec_df is None: continue
 			sec_df = sec_df.rename(columns=dict((k, f'{sec_exp}.{k}') for k in sec_df.keys()))
 			sec_df['time'] = join_time(sec_df[f'{sec_exp}.time'], primary_times, primary_time_range)
-			primary_df = pd.merge(primary_df, sec_df, on='time', how='left')
+			primary_df = primary_df.join(sec_df.set_index('time'), how='left')
+			primary_columns += list(sec_df.keys())[:-1]
+
+		# the join may upcast the index (e.g., secondary times not joined are None)
+		primary_df.index = primary_df.index.astype(primary_time_dtype)
+		primary_df = primary_df.reset_index()[primary_columns]
 
 		primary_df = primary_df.loc[primary_df['time'] >= 0].sort_values('time')
 		primary_df.drop_duplicates(subset='time', keep='first', inplace=True)
@@ -1043,22 +1176,15 @@ class File:
 		ret = primary_df
 
 		if self._num_at > 0:
-			w_name = []
-			w_num = []
-			for _, d in ret.iterrows():
-				last_name = None
-				last_num  = None
-				for w in self.w_list.values():
-					if w['time'] > d['time']:
-						break
-					last_name = w['name']
-					last_num  = w['number']
-
-				w_name.append(last_name)
-				w_num.append(last_num)
-
-			ret['w']      = w_num
-			ret['w_name'] = w_name
+			# index of the last workload started at or before each row's time (-1 = none)
+			w_list_vals = list(self.w_list.values())
+			w_times = numpy.array([w['time'] for w in w_list_vals])
+			w_names = numpy.array([w['name'] for w in w_list_vals] + [None], dtype=object)
+			w_nums  = numpy.array([w['number'] for w in w_list_vals] + [None], dtype=object)
+			idx = numpy.searchsorted(w_times, ret['time'].to_numpy(), side='right') - 1
+
+			ret['w']      = w_nums[idx].tolist()
+			ret['w_name'] = pd.Categorical(w_names[idx].tolist(), categories=list(self.w_list.keys()), ordered=True)
 		else:
 			ret['w']      = [0    for _ in range(len(ret))]
 			ret['w_name'] = ['w0' for _ in range(len(ret))]
@@ -1066,10 +1192,42 @@ class File:
 		self._pd_data = ret
 		self.after_pd_tag_quantiles()
 		self.after_pd_agg_pressure()
+		self._cache_write(ret, 'pd_data')
+		return self._after_pd_data()
+
+	def _after_pd_data(self):
+		ret = self._pd_data
 		if self._options.after_pd_data is not None:
 			self._options.after_pd_data(self)
 		return ret
 
+	def _cache_filename(self, kind: str, name: str = '') -> str:
+		st = os.stat(self._filename)
+		key = repr((os.path.abspath(self._filename), st.st_mtime_ns, st.st_size, PROJECT_VERSION,
+		            kind, name, self._options.w_labels))
+		return f'{self._filename_without_ext}.{kind}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.parquet'
+
+	def _cache_read(self, kind: str, name: str = ''):
+		if not self._options.cache_pd_data:
+			return None
+		try:
+			filename = self._cache_filename(kind, name)
+			if os.path.exists(filename):
+				return pd.read_parquet(filename)
+		except Exception as e:
+			print(f'WARN: failed to read the {kind} cache of "{self._filename}": {str(e)}')
+		return None
+
+	def _cache_write(self, df, kind: str, name: str = ''):
+		if not self._options.cache_pd_data:
+			return
+		try:
+			filename = self._cache_filename(kind, name)
+			df.to_parquet(f'{filename}.tmp')
+			os.replace(f'{filename}.tmp', filename)
+		except Exception as e:
+			print(f'WARN: failed to write the {kind} cache of "{self._filename}": {str(e)}')
+
 	def _pd_data_convert(self, key, value):
 		if key.find('rocksdb.cfstats.compaction') > 0:
 			#if key.find('SizeBytes') > 0:
@@ -1092,13 +1250,12 @@ class File:
 			if colname not in keys:
 				print(f'WARN: column "{colname}" not found')
 				continue
-			for w in pd.unique(df['w_name']):
-				df2 = df.loc[df['w_name'] == w, colname]
-				df.loc[df['w_name'] == w, newcolumn] = \
-					[0.25 if r < 0.26 else
-					 0.5 if r < 0.51 else
-					 0.75 if r < 0.76 else
-					 1.0 for r in df2.rank(pct=True)]
+			ranks = df.groupby('w_name', observed=True)[colname].rank(pct=True).to_numpy()
+			if _bucket_ranks_jit is not None and len(ranks) > 10000:  # not worth the JIT warmup below that
+				quantiles = _bucket_ranks_jit(ranks)
+			else:
+				quantiles = _bucket_ranks(ranks)
+			df[newcolumn] = numpy.where(df['w_name'].isna(), numpy.nan, quantiles)
 
 	def after_pd_agg_pressure(self):
 		key_groups = {}
@@ -1111,7 +1268,8 @@ class File:
 
 		for k, cols in key_groups.items():
 			if k.find('/s.') < 0: continue
-			self.pd_data[f'agg.pressure.{k}'] = self.pd_data[cols].sum(axis=1)
+			vals = self.pd_data[sorted(cols)].to_numpy(dtype=numpy.float64, na_value=numpy.nan)
+			self.pd_data[f'agg.pressure.{k}'] = numpy.nansum(vals, axis=1)
 
 	def diagnostics(self, name='all'):
 		print('Data diagnostics from file:', self.filename)
@@ -1256,42 +1414,47 @@ class File:
 		if num_dbbench == 0 and num_ycsb == 0:
 			return
 
-		args = self.overlap_args(self._options.args_db, kargs)
+		opt, dbbench = self._options, self._dbbench
+		args = self.overlap_args(opt.args_db, kargs)
+		mean_interval = args.get('mean_interval')
 
 		fig, ax = plt.subplots()
 		fig.set_figheight(3)
 		fig.set_figwidth(9)
 
-		Ymax = -1
-		Xmin, Xmax = 10**10, -10**10
+		xs = []  # time series plotted, for the x limits
 		allfiles_d = None
+
+		w_means = None  # per-workload means of all DBs, grouped once
+		if mean_interval is None and self._num_at > 0:
+			df = self.pd_data
+			mean_cols = ['time_min'] + [c for c in
+				[f'db_bench[{i}].ops_per_s' for i in range(num_dbbench)] + [f'ycsb[{i}].ops_per_s' for i in range(num_ycsb)]
+				if c in self.pd_data_columns]
+			w_means = df.groupby('w_name', sort=False, observed=True)[mean_cols].mean().sort_values('time_min')
 		for i in range(0, num_dbbench):
-			X = [i['time']/60.0 for i in self._data[f'db_bench[{i}]']]
-			Y = [i['ops_per_s'] for i in self._data[f'db_bench[{i}]']]
+			rec = self._ndrec(f'db_bench[{i}]')
+			X = self._time_min(f'db_bench[{i}]')
+			Y = rec['ops_per_s'].to_numpy()
 
 			Xplot, Yplot = X, Y
-			Xmin = min([Xmin, min(Xplot)])
-			Xmax = max([Xmax, max(Xplot)])
-			Ymax = max([Ymax, max(Yplot)])
+			xs.append(Xplot)
 			ax.plot(Xplot, Yplot, '-', lw=1, label=f'db_bench')
 
-			if self._dbbench[i].get("sine_d") is not None:
-				sine_a = coalesce(self._dbbench[i]['sine_a'], 0)
-				sine_b = coalesce(self._dbbench[i]['sine_b'], 0)
-				sine_c = coalesce(self._dbbench[i]['sine_c'], 0)
-				sine_d = coalesce(self._dbbench[i]['sine_d'], 0)
-				Y = [ sine_a * math.sin(sine_b * x + sine_c) + sine_d for x in X]
+			if dbbench[i].get("sine_d") is not None:
+				sine_a = coalesce(dbbench[i]['sine_a'], 0)
+				sine_b = coalesce(dbbench[i]['sine_b'], 0)
+				sine_c = coalesce(dbbench[i]['sine_c'], 0)
+				sine_d = coalesce(dbbench[i]['sine_d'], 0)
+				Y = sine_a * numpy.sin(sine_b * X + sine_c) + sine_d
 				Xplot, Yplot = X, Y
 				ax.plot(Xplot, Yplot, '-', lw=1, label=f'db_bench (expected)')
 
-			if args.get('mean_interval') is not None:
-				X, Y = self.get_mean(Xplot, Yplot, args.get('mean_interval'))
+			if mean_interval is not None:
+				X, Y = self.get_mean(Xplot, Yplot, mean_interval)
 				ax.plot(X, Y, '-', lw=1, label=f'db_bench mean')
-			elif self._num_at > 0:
-				df = self.pd_data.groupby(['w_name']).agg(
-					{'time_min': 'mean', f'db_bench[{i}].ops_per_s': 'mean'}
-					).sort_values('time_min')
-				sns.lineplot(ax=ax, x='time_min', y='db_bench[0].ops_per_s', data=df)
+			elif w_means is not None:
+				sns.lineplot(ax=ax, x='time_min', y=f'db_bench[{i}].ops_per_s', data=w_means)
 
 		for i in range(0, num_ycsb):
 			try:
@@ -1299,30 +1462,28 @@ class File:
 				i_label = {'workloada': 'A', 'workloadb':'B'}[workload]
 			except:
 				i_label = i
-			X = [i['time']/60.0 for i in self._data[f'ycsb[{i}]']]
-			Y = [i['ops_per_s'] for i in self._data[f'ycsb[{i}]']]
+			rec = self._ndrec(f'ycsb[{i}]')
+			X = self._time_min(f'ycsb[{i}]')
+			Y = rec['ops_per_s'].to_numpy()
 			Xplot, Yplot = X, Y
-			Xmin = min([Xmin, min(Xplot)])
-			Xmax = max([Xmax, max(Xplot)])
-			Ymax = max([Ymax, max(Yplot)])
+			xs.append(Xplot)
 			ax.plot(Xplot, Yplot, '-', lw=1, label=f'ycsb {i_label}')
 
-			if args.get('mean_interval') is not None:
-				X, Y = self.get_mean(Xplot, Yplot, args.get('mean_interval'))
+			if mean_interval is not None:
+				X, Y = self.get_mean(Xplot, Yplot, mean_interval)
 				ax.plot(X, Y, '-', lw=1, label=f'ycsb {i_label} mean')
-			elif self._num_at > 0:
-				df = self.pd_data.groupby(['w_name']).agg(
-					{'time_min': 'mean', f'ycsb[{i}].ops_per_s': 'mean'}
-					).sort_values('time_min')
-				sns.lineplot(ax=ax, x='time_min', y='ycsb[0].ops_per_s', data=df)
+			elif w_means is not None:
+				sns.lineplot(ax=ax, x='time_min', y=f'ycsb[{i}].ops_per_s', data=w_means)
 
-		if self._options.db_xlim is not None:
-			ax.set_xlim( self._options.db_xlim )
+		Xmin = min(x.min() for x in xs)
+		Xmax = max(x.max() for x in xs)
+		if opt.db_xlim is not None:
+			ax.set_xlim( opt.db_xlim )
 		else:
 			aux = (Xmax - Xmin) * 0.01
 			ax.set_xlim([Xmin-aux, Xmax+aux])
-		if self._options.db_ylim is not None:
-			ax.set_ylim( self._options.db_ylim )
+		if opt.db_ylim is not None:
+			ax.set_ylim( opt.db_ylim )
 
 		self.set_x_ticks(ax)
 
@@ -1336,14 +1497,19 @@ class File:
 		#ax.legend(loc='upper center', bbox_to_anchor=(1.35, 0.9), title='threads', ncol=1, frameon=True)
 		ax.legend(loc='best', ncol=1, frameon=True)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_db.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_db', opt)
+
+	_pd_data_columns = (None, frozenset())
+	@property
+	def pd_data_columns(self) -> frozenset:
+		"""Column names of pd_data as a frozenset (rebuilt when pd_data gets a new columns index)."""
+		columns = self.pd_data.columns
+		if self._pd_data_columns[0] is not columns:
+			self._pd_data_columns = (columns, frozenset(columns))
+		return self._pd_data_columns[1]
 
 	def check_and_get_column(self, name):
-		if name not in self.pd_data.keys():
+		if name not in self.pd_data_columns:
 			raise KeyError(f'column named "{name}" not found in pd_data')
 		return name
 
@@ -1364,6 +1530,9 @@ class File:
 
 			args = self.overlap_args(kargs)
 
+			level_keys = [f'ycsb[0].socket_report.rocksdb.cfstats.compaction.L{i}.SizeBytes' for i in range(l_max + 1)]
+			col_max = df.reindex(columns=[cols['comp']] + level_keys).max()  # one reduction for the y limits
+
 			fig = plt.figure()
 			gs = fig.add_gridspec(l_max + 1, 6, hspace=0.0, wspace=0.4)
 			axs = gs.subplots()
@@ -1393,23 +1562,24 @@ class File:
 						 label='comp. files', color='green')
 			ax2.legend(loc='center right')
 			ax2.set(ylabel='comp. files')
-			ax2.set_ylim([0, float(df[key].max()) * 3.])
+			ax2.set_ylim([0, float(col_max[key]) * 3.])
 
 			self.add_upper_ticks(ax, None, None, args)
 
 			# ============= g2 ==============
 			scale = 1024. ** 3
 			X = df['time_min']
+			present = [k in df.columns for k in level_keys]
+			sizes = df.reindex(columns=level_keys).to_numpy(dtype=float, na_value=numpy.nan) / scale
+			y_max = col_max[level_keys].to_numpy(dtype=float, na_value=numpy.nan) / scale * 1.1
 			for i in range(l_max + 1):
 				ax = axs[i, 1]
 				ax_grid.append(ax)
-				key = f'ycsb[0].socket_report.rocksdb.cfstats.compaction.L{i}.SizeBytes'
-				if key in df.keys():
-					Y = [v / scale for v in df[key]]
-					ax.plot(X, Y, '-', lw=1.4)
-					ax.set_ylim([-0.005, float(df[key].max() / scale) * 1.1])
+				if present[i]:
+					ax.plot(X, sizes[:, i], '-', lw=1.4)
+					ax.set_ylim([-0.005, float(y_max[i])])
 				else:
-					ax.plot(X, [0 for _ in X], '-', lw=1.4)
+					ax.plot(X, numpy.zeros(len(X)), '-', lw=1.4)
 				if i == 0:
 					ax.set(title='Leve Size (GiB)', xlabel=None, ylabel=None)
 				elif i == l_max:
@@ -1439,8 +1609,10 @@ class File:
 			ax_grid.append(ax)
 			if isinstance(args.get('g3_args'), dict):
 				g3_kw = {**g3_kw, **args['g3_args']}
-			sns.ecdfplot(ax=ax, data=df,
-			             x=cols['tx/s'], **g3_kw)
+				sns.ecdfplot(ax=ax, data=df,
+				             x=cols['tx/s'], **g3_kw)
+			else:
+				ecdfplot(ax, df, cols['tx/s'], **g3_kw)
 			ax.set(title='tx/s CDF', xlabel='tx/s', ylabel='proportion')
 			ax.set_xlim([0, None])
 			if 'hue_title' in args.keys():
@@ -1451,8 +1623,10 @@ class File:
 			ax_grid.append(ax)
 			if isinstance(args.get('g4_args'), dict):
 				g4_kw = {**g4_kw, **args['g4_args']}
-			sns.ecdfplot(ax=ax, data=df, legend=None,
-			             x=cols['comp'], **g4_kw)
+				sns.ecdfplot(ax=ax, data=df, legend=None,
+				             x=cols['comp'], **g4_kw)
+			else:
+				ecdfplot(ax, df, cols['comp'], legend=False, **g4_kw)
 			ax.set(title='Compaction CDF', xlabel='files', ylabel='proportion')
 
 			# ============= g5 ==============
@@ -1460,7 +1634,9 @@ class File:
 			ax_grid.append(ax)
 			if isinstance(args.get('g5_args'), dict):
 				g5_kw = {**g5_kw, **args['g5_args']}
-			sns.violinplot(ax=ax, data=df, y=cols['tx/s'], **g5_kw)
+				sns.violinplot(ax=ax, data=df, y=cols['tx/s'], **g5_kw)
+			else:
+				violinplot(ax, df, cols['tx/s'], **g5_kw)
 			ax.set(title='tx/s', ylabel='tx/s', xlabel=args['hue_title'] if 'hue_title' in args.keys() else None)
 
 			# ============= g6 ==============
@@ -1485,9 +1661,8 @@ class File:
 				'agg.pressure': 'pressure',
 				'time': None,
 			}
-			for k in self.pd_data.filter(regex='.*\.time$').keys():
-				rename_drop_map[k] = None
-			df2 = rename_drop_prefixes(self.pd_data, rename_drop_map).corr()[main_column]
+			rename_drop_map.update((k, None) for k in self.pd_data.columns if _RE_TIME_SUFFIX.search(k))
+			df2 = corr_with(rename_drop_prefixes(self.pd_data, rename_drop_map), main_column)
 			columns_filtered = list(df2.sort_values(ascending=False, key=lambda x: abs(x)).keys())
 			if len(columns_filtered) > max_items:
 				columns_filtered = columns_filtered[0:max_items]
@@ -1499,16 +1674,12 @@ class File:
 
 			###############
 			for ax in ax_grid:
-				ax.xaxis.set_minor_locator(AutoMinorLocator(4))
-				ax.yaxis.set_minor_locator(AutoMinorLocator(2))
+				ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(4))
+				ax.yaxis.set_minor_locator(mticker.AutoMinorLocator(2))
 				ax.grid(which='major', color='#CCCCCC', linestyle='--')
 				ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
-			if self._options.save:
-				for f in self._options.formats:
-					save_name = f'{self._filename_without_ext}_graph_db_summary.{f}'
-					fig.savefig(save_name, bbox_inches="tight")
-			plt.show()
+			save_and_show(fig, f'{self._filename_without_ext}_graph_db_summary', self._options)
 
 		except Exception as e:
 			print(f'ERROR in graph_db_summary(): {str(e)}')
@@ -1526,6 +1697,7 @@ class File:
 			return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
 		df = self.pd_data_exp('performancemonitor')
 		df_keys = df.keys()
@@ -1549,24 +1721,24 @@ class File:
 				Yr = df['disk.diskstats.rkB/s']/1024.0
 				Yw = df['disk.diskstats.wkB/s']/1024.0
 				Yt = Yr + Yw
-				ax.plot(X, Yr, '-', lw=1, label='read', color='green')
-				ax.plot(X, Yw, '-', lw=1, label='write', color='orange', alpha=0.8)
-				ax.plot(X, Yt, '-', lw=1, label='total', color='blue', alpha=0.8)
+				ax.plot(*downsample(X, Yr, max_points), '-', lw=1, label='read', color='green')
+				ax.plot(*downsample(X, Yw, max_points), '-', lw=1, label='write', color='orange', alpha=0.8)
+				ax.plot(*downsample(X, Yt, max_points), '-', lw=1, label='total', color='blue', alpha=0.8)
 				ax.set(ylabel="MiB/s")
 				ax.legend(loc='upper left', ncol=1, frameon=True, bbox_to_anchor=(1.02, 1.), borderaxespad=0)
 			elif ax_i == 1:
 				Yr = df['disk.diskstats.r/s']
 				Yw = df['disk.diskstats.w/s']
 				Yt = Yr + Yw
-				ax.plot(X, Yr, '-', lw=1, label='read', color='green')
-				ax.plot(X, Yw, '-', lw=1, label='write', color='orange', alpha=0.8)
-				ax.plot(X, Yt, '-', lw=1, label='total', color='blue', alpha=0.8)
+				ax.plot(*downsample(X, Yr, max_points), '-', lw=1, label='read', color='green')
+				ax.plot(*downsample(X, Yw, max_points), '-', lw=1, label='write', color='orange', alpha=0.8)
+				ax.plot(*downsample(X, Yt, max_points), '-', lw=1, label='total', color='blue', alpha=0.8)
 				ax.set(ylabel="IOPS")
 			elif ax_i == 2:
 				Yr = df['disk.diskstats.read_time_ms']
 				Yw = df['disk.diskstats.write_time_ms']
-				ax.plot(X, Yr, '-', lw=1, label='read', color='green')
-				ax.plot(X, Yw, '-', lw=1, label='write', color='orange', alpha=0.8)
+				ax.plot(*downsample(X, Yr, max_points), '-', lw=1, label='read', color='green')
+				ax.plot(*downsample(X, Yw, max_points), '-', lw=1, label='write', color='orange', alpha=0.8)
 				ax.set(xlabel="time (min)", ylabel="time spent\n(ms)")
 
 			#chartBox = ax.get_position()
@@ -1583,15 +1755,12 @@ class File:
 
 		fig.tight_layout()
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_io.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_io', self._options)
 
 	def graph_io_old(self):
 		if self._data.get('iostat') is None:
 			return
+		rec = self._ndrec('iostat')
 		fig, axs = plt.subplots(3, 1)
 		fig.set_figheight(5)
 		fig.set_figwidth(8)
@@ -1599,9 +1768,9 @@ class File:
 		for ax_i in range(0,3):
 			ax = axs[ax_i]
 			if ax_i == 0:
-				X = [i['time']/60.0 for i in self._data['iostat']]
-				Yr = numpy.array([i['rMB/s']     for i in self._data['iostat']])
-				Yw = numpy.array([i['wMB/s']     for i in self._data['iostat']])
+				X = self._time_min('iostat')
+				Yr = rec['rMB/s'].to_numpy()
+				Yw = rec['wMB/s'].to_numpy()
 				Yt = Yr + Yw
 				ax.plot(X, Yr, '-', lw=1, label='read', color='green')
 				ax.plot(X, Yw, '-', lw=1, label='write', color='orange')
@@ -1609,14 +1778,14 @@ class File:
 				ax.set(title="iostat", ylabel="MB/s")
 				ax.legend(loc='upper right', ncol=3, frameon=True)
 			elif ax_i == 1:
-				Y = [i['r/s']     for i in self._data['iostat']]
+				Y = rec['r/s'].to_numpy()
 				ax.plot(X, Y, '-', lw=1, label='read', color='green')
-				Y = [i['w/s']     for i in self._data['iostat']]
+				Y = rec['w/s'].to_numpy()
 				ax.plot(X, Y, '-', lw=1, label='write', color='orange')
 				ax.set(ylabel="IO/s")
 				ax.legend(loc='upper right', ncol=2, frameon=True)
 			elif ax_i == 2:
-				Y = [i['%util']     for i in self._data['iostat']]
+				Y = rec['%util'].to_numpy()
 				ax.plot(X, Y, '-', lw=1, label='%util')
 				ax.set(xlabel="time (min)", ylabel="percent")
 				ax.set_ylim([-5, 105])
@@ -1633,11 +1802,7 @@ class File:
 
 		fig.tight_layout()
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_io.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_io', self._options)
 
 	# DEPRECATED
 	def graph_io_norm(self):
@@ -1653,24 +1818,19 @@ class File:
 		ax.grid()
 		ax.set(ylabel="normalized performance")
 
-		X = [i['time']/60.0 for i in self._data['iostat']]
+		X = self._time_min('iostat')
 		self.save_plot_data('io_norm_total_X', X)
-		Yr = numpy.array([i['rMB/s']     for i in self._data['iostat']])
-		Yw = numpy.array([i['wMB/s']     for i in self._data['iostat']])
-		Yt = Yr + Yw
+		rec = self._ndrec('iostat')
+		Yt = rec['rMB/s'].to_numpy(dtype=numpy.float64) + rec['wMB/s'].to_numpy(dtype=numpy.float64)
 		self.save_plot_data('io_norm_total_Y_raw', Yt)
 		Yt = Yt / Yt[0]
 		self.save_plot_data('io_norm_total_Y', Yt)
 		ax.plot(X, Yt, '-', lw=1, label='device', color='blue')
 
-		cur_at = self._data['access_time3[0]']
-		X = [j['time']/60.0 for j in cur_at]
-		Y = numpy.array([j['total_MiB/s'] if j['wait'] == 'false' else None for j in cur_at])
-		Yfirst = None
-		for i in Y:
-			if i is not None:
-				Yfirst = i
-				break
+		X = self._time_min('access_time3[0]')
+		Y = self._at3_running(self._ndrec('access_time3[0]'), 'total_MiB/s')
+		running = numpy.flatnonzero(~numpy.isnan(Y))
+		Yfirst = Y[running[0]] if len(running) > 0 else None
 		if Yfirst is not None and Yfirst != 0:
 			Y = Y/Yfirst
 			ax.plot(X, Y, '-', lw=1, label='job0', color='green')
@@ -1691,27 +1851,33 @@ class File:
 
 		fig.tight_layout()
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_io_norm.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_io_norm', self._options)
 
 	def graph_cpu(self, **kargs):
 		self.graph_cpu_new(**kargs)
 		self.graph_cpu_old()
 
+	_cpu_percent = None
+	@property
+	def cpu_percent(self):
+		"""performancemonitor CPU percentages as arrays: 'fields' (names), 'active' (mask of the
+		busy fields), 'total' (time x field), and 'per_cpu' (time x cpu x field)."""
+		if self._cpu_percent is None:
+			cpu_data = [x['cpu'] for x in self._data['performancemonitor']]
+			fields = list(dict.fromkeys(k for c in cpu_data for k in c['percent_total'].keys()))
+			self._cpu_percent = {
+				'fields': fields,
+				'active': numpy.array([k not in ('idle', 'iowait', 'steal') for k in fields]),
+				'total': numpy.array([[c['percent_total'].get(k, 0.) for k in fields] for c in cpu_data], dtype=numpy.float64),
+				'per_cpu': numpy.array([[[p.get(k, 0.) for k in fields] for p in c['percent']] for c in cpu_data], dtype=numpy.float64),
+			}
+		return self._cpu_percent
+
 	def graph_cpu_new(self, **kargs):
 		if 'performancemonitor' not in self._data.keys(): return
 
-		def sum_active(percents):
-			s = 0.
-			for k, v in percents.items():
-				if k not in ('idle', 'iowait', 'steal'):
-					s += v
-			return s
-
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
 		fig, axs = plt.subplots(2, 1)
 		fig.set_figheight(4)
@@ -1719,16 +1885,19 @@ class File:
 		axs[0].grid()
 		axs[1].grid()
 
-		X = [x['time']/60.0 for x in self._data['performancemonitor']]
-		Y = [ sum_active(x['cpu']['percent_total']) for x in self._data['performancemonitor'] ]
-		axs[0].plot(X, Y, '-', lw=1, label='usage')
+		X = self._time_min('performancemonitor')
+		cpu_percent = self.cpu_percent
+		active = cpu_percent['active']
+		Y = cpu_percent['total'][:, active].sum(axis=1)
+		axs[0].plot(*downsample(X, Y, max_points), '-', lw=1, label='usage')
 
-		Y = [i['cpu']['percent_total']['iowait'] for i in self._data['performancemonitor']]
-		axs[0].plot(X, Y, '-', lw=1, label='iowait', alpha=0.8)
+		Y = cpu_percent['total'][:, cpu_percent['fields'].index('iowait')]
+		axs[0].plot(*downsample(X, Y, max_points), '-', lw=1, label='iowait', alpha=0.8)
 
+		per_cpu_active = cpu_percent['per_cpu'][:, :, active].sum(axis=2)
 		for i in range(0, int(self._data['performancemonitor'][0]['cpu']['count'])):
-			Y = [ sum_active(x['cpu']['percent'][i]) for x in self._data['performancemonitor'] ]
-			axs[1].plot(X, Y, '-', lw=1, label='cpu{}'.format(i), alpha=0.7)
+			Y = per_cpu_active[:, i]
+			axs[1].plot(*downsample(X, Y, max_points), '-', lw=1, label='cpu{}'.format(i), alpha=0.7, rasterized=True)
 
 		aux = (X[-1] - X[0]) * 0.01
 		for ax in axs:
@@ -1744,11 +1913,7 @@ class File:
 
 		self.add_upper_ticks(axs[0], int(X[0]), int(X[-1]), args)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_cpu.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_cpu', self._options)
 
 	def graph_cpu_old(self):
 		if 'systemstats' not in self._data.keys() or self._data['systemstats'][0].get('cpus.active') is None:
@@ -1760,18 +1925,15 @@ class File:
 		axs[0].grid()
 		axs[1].grid()
 
-		X = [i['time']/60.0   for i in self._data['systemstats']]
-		Y = [i['cpus.active'] for i in self._data['systemstats']]
-		axs[0].plot(X, Y, '-', lw=1, label='usage (all)')
-
-		Y = [i['cpus.iowait'] for i in self._data['systemstats']]
-		axs[0].plot(X, Y, '-', lw=1, label='iowait')
+		X = self._time_min('systemstats')
+		rec = self._ndrec('systemstats')
+		axs[0].plot(X, rec['cpus.active'].to_numpy(), '-', lw=1, label='usage (all)')
+		axs[0].plot(X, rec['cpus.iowait'].to_numpy(), '-', lw=1, label='iowait')
 
 		for i in range(0,1024):
 			if self._data['systemstats'][0].get('cpu[{}].active'.format(i)) is None:
 				break
-			Y = [j['cpu[{}].active'.format(i)] for j in self._data['systemstats']]
-			axs[1].plot(X, Y, '-', lw=1, label='cpu{}'.format(i))
+			axs[1].plot(X, rec['cpu[{}].active'.format(i)].to_numpy(), '-', lw=1, label='cpu{}'.format(i))
 
 		aux = (X[-1] - X[0]) * 0.01
 		for ax in axs:
@@ -1789,34 +1951,32 @@ class File:
 
 		axs[0].legend(loc='upper right', ncol=2, frameon=True)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_cpu.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_cpu', self._options)
 
 	def graph_at3(self, **kargs):
-		if self._num_at == 0 or self._num_at is None:
+		num_at = self._num_at
+		if num_at == 0 or num_at is None:
 			return
 		#print(f'graph_at3() filename: {self._filename}')
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
-		fig, axs = plt.subplots(self._num_at, 1)
+		fig, axs = plt.subplots(num_at, 1)
 		fig.set_figheight(5)
 		fig.set_figwidth(8)
 
-		for i in range(0,self._num_at):
-			ax = axs[i] if self._num_at > 1 else axs
+		for i in range(0,num_at):
+			ax = axs[i] if num_at > 1 else axs
 			ax.grid()
-			cur_at = self._data[f'access_time3[{i}]']
-			X = [j['time']/60.0 for j in cur_at]
-			Y = [j.get('read_MiB/s') if j['wait'] == 'false' else None for j in cur_at]
-			ax.plot(X, Y, '-', lw=1, label='read', color='green')
-			Y = [j.get('write_MiB/s') if j['wait'] == 'false' else None for j in cur_at]
-			ax.plot(X, Y, '-', lw=1, label='write', color='orange', alpha=0.8)
-			Y = [j.get('total_MiB/s') if j['wait'] == 'false' else None for j in cur_at]
-			ax.plot(X, Y, '-.', lw=1, label='total', color='blue', alpha=0.4)
+			rec = self._ndrec(f'access_time3[{i}]')
+			X = self._time_min(f'access_time3[{i}]')
+			Y = self._at3_running(rec, 'read_MiB/s')
+			ax.plot(*downsample(X, Y, max_points), '-', lw=1, label='read', color='green')
+			Y = self._at3_running(rec, 'write_MiB/s')
+			ax.plot(*downsample(X, Y, max_points), '-', lw=1, label='write', color='orange', alpha=0.8)
+			Y = self._at3_running(rec, 'total_MiB/s')
+			ax.plot(*downsample(X, Y, max_points), '-.', lw=1, label='total', color='blue', alpha=0.4)
 
 			ax_set = dict()
 			ax_set['ylabel'] = f"at3[{i}]\nMB/s"
@@ -1824,9 +1984,9 @@ class File:
 			if i == 0:
 				ax_set['title'] = self.get_graph_title(args, "access_time3 (at3): performance")
 				ax.legend(loc='upper left', ncol=1, bbox_to_anchor=(1.02, 1.), borderaxespad=0.)
-			if i == self._num_at -1:
+			if i == num_at -1:
 				ax_set['xlabel'] = "time (min)"
-			if i>=0 and i < self._num_at -1:
+			if i>=0 and i < num_at -1:
 				ax.xaxis.set_ticklabels([])
 
 			aux = (X[-1] - X[0]) * 0.01
@@ -1839,37 +1999,34 @@ class File:
 
 		plt.subplots_adjust(hspace=0.1)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_at3.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_at3', self._options)
 
 	def graph_at3_script(self, **kargs):
-		if self._num_at == 0 or self._num_at is None:
+		num_at = self._num_at
+		if num_at == 0 or num_at is None:
 			return
 
 		args = self.overlap_args(kargs)
 
-		fig, axs = plt.subplots(self._num_at, 1)
+		fig, axs = plt.subplots(num_at, 1)
 		fig.set_figheight(5)
 		fig.set_figwidth(8)
 
-		for i in range(0,self._num_at):
-			ax = axs[i] if self._num_at > 1 else axs
+		for i in range(0,num_at):
+			ax = axs[i] if num_at > 1 else axs
 			if i == 0:
 				ax0 = ax
 
 			ax.grid()
-			cur_at = self._data[f'access_time3[{i}]']
-			X = [j['time']/60.0 for j in cur_at]
-			Y = [j.get('write_ratio') if j['wait'] == 'false' else None for j in cur_at]
+			rec = self._ndrec(f'access_time3[{i}]')
+			X = self._time_min(f'access_time3[{i}]')
+			Y = self._at3_running(rec, 'write_ratio')
 			ax.plot(X, Y, '-', lw=1.5, label='write_ratio (wr)', color='orange')
-			Y = [j.get('random_ratio') if j['wait'] == 'false' else None for j in cur_at]
+			Y = self._at3_running(rec, 'random_ratio')
 			ax.plot(X, Y, '-.', lw=1.5, label='random_ratio (rr)', color='blue')
 
 			ax2 = ax.twinx()
-			Y = [j.get('iodepth') if j['wait'] == 'false' else None for j in cur_at]
+			Y = self._at3_running(rec, 'iodepth')
 			ax2.plot(X, Y, '-', lw=1.5, label='iodepth (d)', color='green')
 			ax2.set(ylabel='iodepth')
 
@@ -1878,12 +2035,12 @@ class File:
 			ax_set['ylabel'] = f'at3[{i}]\nratio'
 			if i == 0:
 				ax_set['title'] = self.get_graph_title(args, 'Concurrent Workloads')
-			if i == self._num_at -1:
-				p = -0.067 * self._num_at
+			if i == num_at -1:
+				p = -0.067 * num_at
 				ax_set['xlabel'] = "time (min)"
 				ax.legend(loc='upper left', ncol=2, bbox_to_anchor=(0., p, 1., p), borderaxespad=0.)
 				ax2.legend(loc='upper right', ncol=2, bbox_to_anchor=(0., p, 1., p), borderaxespad=0.)
-			if i < self._num_at - 1:
+			if i < num_at - 1:
 				ax.xaxis.set_ticklabels([])
 
 			aux = (X[-1] - X[0]) * 0.01
@@ -1897,11 +2054,7 @@ class File:
 
 		plt.subplots_adjust(hspace=0.1)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_at3_script.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_at3_script', self._options)
 
 	def graph_at3_write_ratio(self):
 		if self._num_at == 0 or self._num_at is None:
@@ -1911,35 +2064,31 @@ class File:
 
 		colors = plt.get_cmap('tab10').colors
 
-		block_sizes = DB.query("select distinct block_size from data where file_id = {} order by block_size".format(self._file_id)).fetchall()
-		random_ratios = DB.query("select distinct random_ratio from data where file_id = {} order by random_ratio".format(self._file_id)).fetchall()
-
-		for i_bs in block_sizes:
-			bs = i_bs[0]
-			ci = 0
+		# mean throughput per (block_size, random_ratio, write_ratio): total and job 0
+		sql = '''SELECT block_size, random_ratio, write_ratio*100 AS wr, AVG(mbps) AS mbps
+			FROM data
+			WHERE file_id = ? {}
+			GROUP BY block_size, random_ratio, write_ratio
+			ORDER BY block_size, random_ratio, write_ratio'''
+		total = pd.read_sql_query(sql.format(''), DB.conn, params=(self._file_id,))
+		total['mbps'] *= self._num_at
+		job0 = pd.read_sql_query(sql.format('AND number = 0'), DB.conn, params=(self._file_id,))
+		total_groups = {k: g for k, g in total.groupby(['block_size', 'random_ratio'])}
+		job0_groups = {k: g for k, g in job0.groupby(['block_size', 'random_ratio'])}
+		random_ratios = sorted(total['random_ratio'].unique())
+
+		for bs in sorted(total['block_size'].unique()):
 			fig, ax = plt.subplots()
 			fig.set_figheight(5)
 			fig.set_figwidth(8)
 			ax.grid()
-			for i_rr in random_ratios:
-				rr = i_rr[0]
-				sql1 = '''SELECT write_ratio*100, AVG(mbps) * {}
-					FROM data
-					WHERE file_id = {} AND block_size = {} AND random_ratio = {}
-					GROUP BY write_ratio ORDER BY write_ratio'''
-				q1 = DB.query(sql1.format(self._num_at, self._file_id, bs, rr))
-				sql2 = '''SELECT write_ratio*100, AVG(mbps)
-					FROM data
-					WHERE file_id = {} AND block_size = {} AND random_ratio = {} AND number = 0
-					GROUP BY write_ratio ORDER BY write_ratio'''
-				q2 = DB.query(sql2.format(self._file_id, bs, rr))
-
-				A = numpy.array(q1.fetchall()).T
-				B = numpy.array(q2.fetchall()).T
-
-				ax.plot(A[0], A[1], '-', color=colors[ci], lw=1, label='rand {}%, total'.format(int(rr*100)))
-				ax.plot(B[0], B[1], '.-', color=colors[ci], lw=1, label='rand {}%, job0'.format(int(rr*100)))
-				ci += 1
+			for ci, rr in enumerate(random_ratios):
+				A = total_groups.get((bs, rr))
+				B = job0_groups.get((bs, rr))
+				if A is not None:
+					ax.plot(A['wr'], A['mbps'], '-', color=colors[ci], lw=1, label='rand {}%, total'.format(int(rr*100)))
+				if B is not None:
+					ax.plot(B['wr'], B['mbps'], '.-', color=colors[ci], lw=1, label='rand {}%, job0'.format(int(rr*100)))
 
 			ax.set(title='jobs={}, bs={}, {}'.format(self._num_at, bs, 'O_DIRECT+O_DSYNC' if self._at_direct_io else 'cache'),
 				xlabel='(writes/reads)*100', ylabel='MB/s')
@@ -1949,11 +2098,7 @@ class File:
 			ax.legend(loc='upper center', bbox_to_anchor=(1.25, 0.9), ncol=1, frameon=True)
 			#ax.legend(loc='best', ncol=1, frameon=True)
 
-			if self._options.save:
-				for f in self._options.formats:
-					save_name = f'{self._filename_without_ext}-at3_bs{bs}.{f}'
-					fig.savefig(save_name, bbox_inches="tight")
-			plt.show()
+			save_and_show(fig, f'{self._filename_without_ext}-at3_bs{bs}', self._options)
 
 	_pressure_data = None
 	@property
@@ -1972,12 +2117,18 @@ class File:
 			else:
 				target_db = self._data['db_bench[0]']
 
+			# last at3 window started at or before each target time (or the first one)
+			w_list_vals = list(self.w_list.values())
+			w_times = numpy.array([w['time'] for w in w_list_vals])
+			target_times = numpy.array([i['time'] for i in target_db])
+			w_idx = numpy.maximum(numpy.searchsorted(w_times, target_times, side='right') - 1, 0)
+
 			target_data = collections.OrderedDict()
-			for i in target_db:
+			for i, wi in zip(target_db, w_idx.tolist()):
 				target_data[i['time']] = collections.OrderedDict()
 				target_data[i['time']]['db'] = i
 
-				w = self.last_at3(i['time'])
+				w = w_list_vals[wi]
 				target_data[i['time']]['at3'] = w['name']
 				target_data[i['time']]['at3_counter'] = w['number']
 
@@ -2051,15 +2202,12 @@ class File:
 		Y2 = data['W_normalized']
 		ax2.plot(X, Y2, '-', label='normalized pressure', color='red')
 
-		X3, Y3 = [], []
-		min_p = Y2[0]
-		for i in range(1, len(Y2)):
-			if Y2[i] < min_p:
-				X3.append(X[i])
-				Y3.append(Y2[i])
-			else:
-				min_p = Y2[i]
 		if args.get('mark_decreased'):
+			# points below the highest pressure seen before them
+			Y2_arr = numpy.asarray(Y2, dtype=numpy.float64)
+			decreased = numpy.zeros(len(Y2_arr), dtype=bool)
+			decreased[1:] = Y2_arr[1:] < numpy.maximum.accumulate(Y2_arr)[:-1]
+			X3, Y3 = numpy.flatnonzero(decreased), Y2_arr[decreased]
 			ax2.plot(X3, Y3, '*', label='decreased', color='red')
 		ax2.legend(loc='upper right', ncol=2, frameon=False)
 		ax2.set(ylabel="normalized pressure")
@@ -2073,7 +2221,7 @@ class File:
 		ax = fig.add_axes([0, 0.62, 1, 0.16])
 
 		X = data['W_normalized']
-		Y = [0 for i in X]
+		Y = numpy.zeros(len(X))
 		ax.plot(X, Y, 'o', label='pressure')
 
 		if args.get('print_values'):
@@ -2083,21 +2231,17 @@ class File:
 		ax.set_ylim([-0.02, 0.1])
 		ax.yaxis.set_ticklabels([])
 
-		for i in range(len(X)):
+		for i in annotation_indices(len(X), self._options.pressure_max_annotations):
 			ax.annotate(f'{X_labels[i]}', xy=(X[i], 0), xytext=(X[i]-0.006,0.035), rotation=90)
 
-		ax.xaxis.set_major_locator(MultipleLocator(0.1))
-		ax.xaxis.set_minor_locator(AutoMinorLocator(4))
+		ax.xaxis.set_major_locator(mticker.MultipleLocator(0.1))
+		ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(4))
 		ax.grid(which='major', color='#888888', linestyle='--')
 		ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
 		ax.set(xlabel="normalized pressure: $(\\rho(w_0)-\\rho(w_i)) / \\rho(w_0)$")
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}-pressure.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}-pressure', self._options)
 
 	_at3_steady_file = None
 	@property
@@ -2180,11 +2324,21 @@ class File:
 				print(f'WARNING: container name "{n}" without pattern')
 		return ret
 
+	_containers_stats = None
+	@property
+	def containers_stats(self):
+		"""performancemonitor container stats flattened once: one column per "{container}.{stat}.{Read|Write}"."""
+		if self._containers_stats is None:
+			perfmon_data = self._data['performancemonitor']
+			self._containers_stats = pd.json_normalize([x.get('containers') or {} for x in perfmon_data], sep='.')
+		return self._containers_stats
+
 	def graph_containers_io(self, **kargs):
 		perfmon_data = self._data.get('performancemonitor')
 		if perfmon_data is None: return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
 		containers_map = self.map_container_names()
 		#print(f'containers_map: {containers_map}')
@@ -2197,10 +2351,17 @@ class File:
 		fig.set_figheight(10)
 		fig.set_figwidth(9)
 
-		X = [x['time']/60.0 for x in self._data['performancemonitor']]
-		sum_Y1r = numpy.array([0. for x in X])
+		X = self._time_min('performancemonitor')
+		sum_Y1r = numpy.zeros(len(X))
 		sum_Y1w, sum_Y2r, sum_Y2w = sum_Y1r.copy(), sum_Y1r.copy(), sum_Y1r.copy()
 
+		containers = self.containers_stats
+		def container_stat(c_name, stat, divisor=1.):
+			col = f'{c_name}.{stat}'
+			if col not in containers.keys():
+				return numpy.full(len(X), numpy.nan)
+			return containers[col].to_numpy(dtype=numpy.float64, na_value=numpy.nan) / divisor
+
 		for i in range(len(axs)):
 			ax = axs[i]
 			ax.grid()
@@ -2210,12 +2371,12 @@ class File:
 				Y1r, Y1w = sum_Y1r, sum_Y1w
 			else:
 				c_name = containers_map['container_names'][i]
-				Y1r = [scale(get_recursive(x, 'containers', c_name, 'blkio.service_bytes/s', 'Read'), 1024 ** 2) for x in self._data['performancemonitor']]
-				sum_Y1r += [coalesce(y,0.) for y in Y1r]
-				Y1w = [scale(get_recursive(x, 'containers', c_name, 'blkio.service_bytes/s', 'Write'), 1024 ** 2) for x in self._data['performancemonitor']]
-				sum_Y1w += [coalesce(y,0.) for y in Y1w]
-			ax.plot(X, Y1r, '-', lw=1, label=f'MiB read', color=colors[0])
-			ax.plot(X, Y1w, '-.', lw=1, label=f'MiB write', color=colors[1])
+				Y1r = container_stat(c_name, 'blkio.service_bytes/s.Read', 1024 ** 2)
+				numpy.add(sum_Y1r, numpy.nan_to_num(Y1r, nan=0.), out=sum_Y1r)
+				Y1w = container_stat(c_name, 'blkio.service_bytes/s.Write', 1024 ** 2)
+				numpy.add(sum_Y1w, numpy.nan_to_num(Y1w, nan=0.), out=sum_Y1w)
+			ax.plot(*downsample(X, Y1r, max_points), '-', lw=1, label=f'MiB read', color=colors[0])
+			ax.plot(*downsample(X, Y1w, max_points), '-.', lw=1, label=f'MiB write', color=colors[1])
 
 			ax.set(ylabel=f"{c_name}\nMiB/s")
 
@@ -2224,12 +2385,12 @@ class File:
 			if i == (len(axs)-1):
 				Y2r, Y2w = sum_Y2r, sum_Y2w
 			else:
-				Y2r = [get_recursive(x, 'containers', c_name, 'blkio.serviced/s', 'Read') for x in self._data['performancemonitor']]
-				sum_Y2r += [coalesce(y,0.) for y in Y2r]
-				Y2w = [get_recursive(x, 'containers', c_name, 'blkio.serviced/s', 'Write') for x in self._data['performancemonitor']]
-				sum_Y2w += [coalesce(y,0.) for y in Y2w]
-			ax2.plot(X, Y2r, ':', lw=1, label=f'IO read', color=colors[2])
-			ax2.plot(X, Y2w, ':', lw=1, label=f'IO write', color=colors[3])
+				Y2r = container_stat(c_name, 'blkio.serviced/s.Read')
+				numpy.add(sum_Y2r, numpy.nan_to_num(Y2r, nan=0.), out=sum_Y2r)
+				Y2w = container_stat(c_name, 'blkio.serviced/s.Write')
+				numpy.add(sum_Y2w, numpy.nan_to_num(Y2w, nan=0.), out=sum_Y2w)
+			ax2.plot(*downsample(X, Y2r, max_points), ':', lw=1, label=f'IO read', color=colors[2])
+			ax2.plot(*downsample(X, Y2w, max_points), ':', lw=1, label=f'IO write', color=colors[3])
 
 			ax2.set(ylabel="IOPS")
 
@@ -2248,30 +2409,23 @@ class File:
 
 		self.add_upper_ticks(axs[0], int(X[0]), int(X[-1]), args)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_containers_io.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_containers_io', self._options)
 
-	_get_lsm_levels = None
-	def get_lsm_levels(self, container='ycsb[0]'):
-		if self._get_lsm_levels is None:
-			self._get_lsm_levels = dict()
-		if self._get_lsm_levels.get(container) is not None:
-			return self._get_lsm_levels.get(container)
+	_lsm_columns = None
+	@property
+	def lsm_columns(self) -> dict:
+		"""pd_data columns of the LSM-tree level stats: {container: {stat_name: {level: column}}}."""
+		if self._lsm_columns is None:
+			ret = collections.defaultdict(lambda: collections.defaultdict(dict))
+			for col in self.pd_data.columns:
+				m = _RE_LSM_COLUMN.match(col)
+				if m is not None:
+					ret[m['c']][m['s']][int(m['l'])] = col
+			self._lsm_columns = {c: dict(stats) for c, stats in ret.items()}
+		return self._lsm_columns
 
-		base_str = f'{container}.socket_report.rocksdb.cfstats.compaction'
-		ret = []
-		df = self.pd_data
-		for i in df.keys():
-			if i.find(base_str) >= 0:
-				r = re.findall(r'\.L([0-9]+)\.SizeBytes', i)
-				if len(r) > 0:
-					ret.append(int(r[0]))
-		ret.sort()
-		self._get_lsm_levels[container] = ret
-		return ret
+	def get_lsm_levels(self, container='ycsb[0]'):
+		return sorted(self.lsm_columns.get(container, {}).get('SizeBytes', {}).keys())
 
 	def graph_ycsb_lsm_stats(self, **kargs):
 		level_list = self.get_lsm_levels()
@@ -2280,14 +2434,16 @@ class File:
 			return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 		df = self.pd_data
 
-		x_min, x_max = df['time_min'].min(), df['time_min'].max()
+		X = df['time_min'].to_numpy()
+		x_min, x_max = X.min(), X.max()
 		aux = (x_max - x_min) * 0.01
 
 		fig = plt.figure()
 		gs = fig.add_gridspec(l_max + 1, 4, hspace=0.0, wspace=0.2)
-		axs = gs.subplots()
+		axs = gs.subplots(sharex='col', squeeze=False)
 		fig.suptitle(self.get_graph_title(args, "LSM-tree stats"), y=1.14)
 		fig.set_figheight(4)
 		fig.set_figwidth(25)
@@ -2308,21 +2464,21 @@ class File:
 			 'scale': 1},
 		]
 
-		df_keys = df.keys()
+		lsm_columns = self.lsm_columns.get('ycsb[0]', {})
 
 		for l in range(0, l_max + 1):
 			for g in graphs:
 				ax = g['axs'][l]
-				y_key = f'ycsb[0].socket_report.rocksdb.cfstats.compaction.L{l}.{g["stat_name"]}'
-				if y_key in df_keys:
-					Y = [v / g['scale'] for v in df[y_key]]
-					ax.plot(df['time_min'], Y, '-', lw=1.4)
+				y_key = lsm_columns.get(g['stat_name'], {}).get(l)
+				if y_key is not None:
+					ax.plot(*downsample(X, df[y_key].to_numpy() / g['scale'], max_points), '-', lw=1.4)
 
 				if l == 0:
 					ax.set(title=g['stat_name'] if g.get('title') is None else g['title'])
 				if l < l_max:
-					ax.sharex(g['axs'][l_max])
-				elif l == l_max:
+					ax.grid(which='major', color='#CCCCCC', linestyle='--')
+					ax.grid(which='minor', color='#CCCCCC', linestyle=':')
+				else:
 					ax.set_xlim([x_min - aux, x_max + aux])
 					self.set_x_ticks(ax)
 					ax.tick_params(axis='x', which='both', bottom=True)
@@ -2331,58 +2487,55 @@ class File:
 				ax.set_ylim([-0.1, None])
 
 		for g in graphs:
-			for l in range(0,l_max):
-				ax = g['axs'][l]
-				ax.tick_params(axis='x', labelbottom=False)
-				ax.grid(which='major', color='#CCCCCC', linestyle='--')
-				ax.grid(which='minor', color='#CCCCCC', linestyle=':')
-
 			#self.add_upper_ticks(g['axs'][0], int(x_min), int(x_max), args)
 			self.add_upper_ticks(g['axs'][0], None, None, args)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_lsm.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_lsm', self._options)
+
+	def graph_ycsb_lsm_generic(self, stats_name: str, y_label: str, y_f=None, scale: float = 1., **kargs) -> None:
+		"""Plot the LSM-tree stats_name of each level (missing values as 0) multiplied by scale.
 
-	def graph_ycsb_lsm_generic(self, stats_name: str, y_label: str, y_f, **kargs) -> None:
+		y_f (deprecated, use scale) is applied to each raw value instead of the conversion to float."""
+		if y_f is not None:
+			warnings.warn('graph_ycsb_lsm_generic: y_f is deprecated, use scale', DeprecationWarning, stacklevel=2)
 		level_list = self.get_lsm_levels()
 		l_max = level_list[-1] if len(level_list) > 0 else -1
 		if l_max < 0:
 			return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 		df = self.pd_data
 
-		x_min, x_max = df['time_min'].min(), df['time_min'].max()
+		X = df['time_min'].to_numpy()
+		x_min, x_max = X.min(), X.max()
 		aux = (x_max - x_min) * 0.01
 
-		fig, axs = plt.subplots(l_max +1, 1)
+		fig, axs = plt.subplots(l_max +1, 1, squeeze=False)
+		axs = axs[:, 0]
 		fig.set_figheight(5)
 		fig.set_figwidth(9)
 
-		df_keys = df.keys()
+		stat_columns = self.lsm_columns.get('ycsb[0]', {}).get(stats_name, {})
 
 		for l in range(0, l_max + 1):
 			ax = axs[l]
-			y_key = f'ycsb[0].socket_report.rocksdb.cfstats.compaction.L{l}.{stats_name}'
+			y_key = stat_columns.get(l)
 			y_max = 0
-			if y_key in df_keys:
-				Y = [y_f(v) for v in df[y_key]]
-				ax.plot(df['time_min'], Y, '-', lw=1.4, label=f'L{l}')
-				y_max = max(Y)
+			if y_key is not None:
+				if y_f is not None:
+					Y = numpy.fromiter((y_f(v) for v in df[y_key]), dtype=numpy.float64, count=len(df)) * scale
+				else:
+					Y = pd.to_numeric(df[y_key], errors='coerce').fillna(0).to_numpy(dtype=numpy.float64) * scale
+				ax.plot(*downsample(X, Y, max_points), '-', lw=1.4, label=f'L{l}')
+				y_max = float(Y.max(initial=0.))
 
 			ax.set(ylabel=y_label.format(**locals()))
 			if ax != axs[-1]:
 				ax.set(xticklabels=[])
 
 			ax.set_xlim([x_min - aux, x_max + aux])
-			try:
-				ax.set_ylim([-.01, y_max * 1.05])
-			except:
-				print(f'ylim exception: y_max={y_max}')
-				ax.set_ylim([-.01, None])
+			ax.set_ylim([-.01, y_max * 1.05 if math.isfinite(y_max) else None])
 
 			if l == 0:
 				self.add_upper_ticks(ax, int(x_min), int(x_max), args)
@@ -2391,18 +2544,14 @@ class File:
 		axs[0].set(title=self.get_graph_title(args, f"LVM-tree stats: {stats_name}"))
 		axs[-1].set(xlabel="time (min)")
 
-		if self._options.save:
-			file_suffix = coalesce(args.get('file_suffix'), stats_name)
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_lsm_{file_suffix}.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		file_suffix = coalesce(args.get('file_suffix'), stats_name)
+		save_and_show(fig, f'{self._filename_without_ext}_graph_lsm_{file_suffix}', self._options)
 
 	def graph_ycsb_lsm_size(self, **kargs) -> None:
 		self.graph_ycsb_lsm_generic(
 			stats_name='SizeBytes',
 			y_label='L{l}\nGiB',
-			y_f=lambda y: float(coalesce(y, 0)) / (1024 ** 3),
+			scale=1. / (1024 ** 3),
 			**kargs)
 
 	def graph_ycsb_lsm_details(self, **kargs) -> None:
@@ -2410,7 +2559,6 @@ class File:
 			self.graph_ycsb_lsm_generic(
 				stats_name=i,
 				y_label=f'L{{l}}',
-				y_f=lambda y: float(coalesce(y, 0)),
 				**kargs)
 
 	def graph_ycsb_lsm_summary(self, **kargs) -> None:
@@ -2419,8 +2567,16 @@ class File:
 			return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
-		X = [x['time']/60.0 for x in self._data['ycsb[0]']]
+		df = self.pd_data_exp('ycsb[0]')
+		def cfstats(stat):  # missing values as 0
+			col = f'socket_report.rocksdb.cfstats.{stat}'
+			if col not in df.keys():
+				return numpy.zeros(len(df))
+			return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=numpy.float64)
+
+		X = df['time'].to_numpy() / 60.0
 		aux = (X[-1] - X[0]) * 0.01
 
 		fig, axs = plt.subplots(2, 1)
@@ -2428,22 +2584,22 @@ class File:
 		fig.set_figwidth(9)
 
 		ax = axs[0]
-		Y1 = [float(coalesce(get_recursive(y, 'socket_report', 'rocksdb.cfstats', 'compaction.Sum.ReadMBps', 0))) for y in ycsb_data]
-		ax.plot(X, Y1, '-', lw=1.4, label='read')
-		Y2 = [float(coalesce(get_recursive(y, 'socket_report', 'rocksdb.cfstats', 'compaction.Sum.WriteMBps', 0))) for y in ycsb_data]
-		ax.plot(X, Y2, '-', lw=1.4, label='write')
+		Y1 = cfstats('compaction.Sum.ReadMBps')
+		ax.plot(*downsample(X, Y1, max_points), '-', lw=1.4, label='read')
+		Y2 = cfstats('compaction.Sum.WriteMBps')
+		ax.plot(*downsample(X, Y2, max_points), '-', lw=1.4, label='write')
 		ax.set(ylabel='compaction\nMiB/s')
 		ax.set(xticklabels=[])
-		ax.set_ylim([-.01, max([max(Y1), max(Y2)]) * 1.1])
+		ax.set_ylim([-.01, max(Y1.max(), Y2.max()) * 1.1])
 
 		ax = axs[1]
-		Y1 = [float(coalesce(get_recursive(y, 'socket_report', 'rocksdb.cfstats', 'io_stalls.total_slowdown', 0))) for y in ycsb_data]
-		ax.plot(X, Y1, '-', lw=1.4, label='total slowdown')
-		Y2 = [float(coalesce(get_recursive(y, 'socket_report', 'rocksdb.cfstats', 'io_stalls.total_stop', 0))) for y in ycsb_data]
-		ax.plot(X, Y2, '-', lw=1.4, label='total stop')
+		Y1 = cfstats('io_stalls.total_slowdown')
+		ax.plot(*downsample(X, Y1, max_points), '-', lw=1.4, label='total slowdown')
+		Y2 = cfstats('io_stalls.total_stop')
+		ax.plot(*downsample(X, Y2, max_points), '-', lw=1.4, label='total stop')
 		ax.set(ylabel='iostalls')
 		#ax.set(xticklabels=[])
-		ax.set_ylim([-.01, max([max(Y1), max(Y2)]) * 1.1])
+		ax.set_ylim([-.01, max(Y1.max(), Y2.max()) * 1.1])
 
 		for ax in axs:
 			ax.set_xlim([X[0]-aux,X[-1]+aux])
@@ -2455,20 +2611,16 @@ class File:
 
 		self.add_upper_ticks(axs[0], int(X[0]), int(X[-1]), args)
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_lsm_summary.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_lsm_summary', self._options)
 
 	facet_templates = {
 		'kv performance': dict(kwargs=dict(title_default='KV Performance'),
-		                       func=sns.ecdfplot),
+		                       func='ecdfplot'),
 		'compacted files': dict(kwargs=dict(title_default='Compacted Files'),
-		                        func=sns.histplot,
+		                        func='histplot',
 		                        func_args=dict(x='ycsb[0].socket_report.rocksdb.cfstats.compaction.Sum.CompactedFiles')),
 		'kv x compacted': dict(kwargs=dict(title_default='KV Performance X Compacted Files'),
-		                       func=sns.scatterplot,
+		                       func='scatterplot',
 		                       func_args=dict(x='ycsb[0].socket_report.rocksdb.cfstats.compaction.Sum.CompactedFiles',
 		                                      y='ycsb[0].ops_per_s',
 		                                      alpha=0.4)),
@@ -2500,6 +2652,8 @@ class File:
 		             **func_args}
 
 		func = coalesce(func, template_args.get('func'), sns.ecdfplot)
+		if isinstance(func, str):  # name of a seaborn function
+			func = getattr(sns, func)
 
 		data_keys = self.pd_data.keys()
 		for k in [facet_args.get(i) for i in ['row', 'col', 'hue']] + [func_args.get(i) for i in ['x', 'y']]:
@@ -2519,11 +2673,7 @@ class File:
 		g.set_titles(col_template='{col_name}')
 		g.fig.set_figheight(2)
 		
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_facet.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(g.fig, f'{self._filename_without_ext}_graph_facet', self._options)
 
 	def graph_smart_utilization(self, **kargs):
 		perfmon_data = get_recursive(self._data, 'performancemonitor')
@@ -2533,6 +2683,7 @@ class File:
 			return
 
 		args = self.overlap_args(kargs)
+		max_points = self._options.max_graph_points
 
 		fig, axs = plt.subplots(1, 1)
 		fig.set_figheight(2)
@@ -2541,9 +2692,11 @@ class File:
 		ax = axs
 
 		capacity = float(get_recursive(perfmon_data, 0, 'smart', 'capacity'))
-		X = [x['time']/60.0 for x in perfmon_data]
-		Y = [100. * float(coalesce(get_recursive(y, 'smart', 'utilization'), 0)) / capacity for y in perfmon_data]
-		ax.plot(X, Y, '-', lw=2)
+		X = self._time_min('performancemonitor')
+		utilization = (get_recursive(y, 'smart', 'utilization') for y in perfmon_data)
+		U = numpy.fromiter((float(u) if u is not None else 0. for u in utilization), dtype=numpy.float64, count=len(perfmon_data))
+		Y = 100. * U / capacity
+		ax.plot(*downsample(X, Y, max_points), '-', lw=2)
 
 		ax.set(title=self.get_graph_title(args, "Flash Pages Utilization"))
 		ax.set(xlabel="time (min)")
@@ -2557,11 +2710,27 @@ class File:
 		self.set_x_ticks(ax)
 		ax.set_ylim([-1, 105])
 
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_smart_utilization.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_smart_utilization', self._options)
+
+	_pd_data_renamed_cache = None
+	_pd_data_renamed_source = None
+	def pd_data_renamed(self, cols: dict, w=None, extra_columns=()) -> pd.DataFrame:
+		"""Rows of pd_data whose column 'w' is w (a value or a list), with only the columns
+		in cols (renamed to their values) and extra_columns. Cached per arguments; returns a
+		shallow copy, so do not modify its values in place."""
+		df = self.pd_data
+		if self._pd_data_renamed_cache is None or self._pd_data_renamed_source is not df:  # pd_data was replaced
+			self._pd_data_renamed_cache = dict()
+			self._pd_data_renamed_source = df
+		key = (tuple(cols.items()), tuple(w) if isinstance(w, list) else w, tuple(extra_columns))
+		ret = self._pd_data_renamed_cache.get(key)
+		if ret is None:
+			if w is not None:
+				df = df.loc[df['w'].isin(w)] if isinstance(w, list) else df.loc[df['w'] == w]
+			keep = list(dict.fromkeys(c for c in [*cols.keys(), *extra_columns] if c in df.columns))
+			ret = df[keep].rename(columns=cols)
+			self._pd_data_renamed_cache[key] = ret
+		return ret.copy(deep=False)
 
 	def graph_pairgrid(self, **kargs):
 		if self._num_ydbs > 0:
@@ -2592,13 +2761,8 @@ class File:
 		pairgrid_kargs = {}
 		if args.get('hue') is not None:
 			pairgrid_kargs['hue'] = args['hue']
-		elif 'w' in df.keys() and df['w'].count() > 0:
+		elif 'w' in self.pd_data_columns and df['w'].count() > 0:
 			pairgrid_kargs['hue'] = 'w'
-		if args.get('w') is not None:
-			if isinstance(args['w'], list):
-				df = df.loc[df['w'].isin(args['w'])]
-			else:
-				df = df.loc[df['w'] == args['w']]
 
 		if args.get('y_vars') is not None:
 			pairgrid_kargs['x_vars'] = [i for i in cols.values()]
@@ -2606,10 +2770,12 @@ class File:
 		else:
 			pairgrid_kargs['vars'] = [i for i in cols.values()]
 
-		df2 = df.rename(columns=cols)
+		df2 = self.pd_data_renamed(cols, args.get('w'), [pairgrid_kargs.get('hue')])
 		g = sns.PairGrid(df2, diag_sharey=False, palette='viridis', **pairgrid_kargs)
-		m1 = g.map_upper(sns.scatterplot)
-		m2 = g.map_lower(sns.scatterplot)
+		large = self._options.pairgrid_large_rows is not None and len(df2) > self._options.pairgrid_large_rows
+		# rasterized: one image per panel in vector formats instead of one path per point
+		m1 = g.map_upper(sns.scatterplot, rasterized=large)
+		m2 = g.map_lower(sns.scatterplot, rasterized=large)
 		g.map_diag(sns.ecdfplot)
 		g.add_legend()
 		for ax in [i for i in m1.axes.flat]+[i for i in m2.axes.flat]:
@@ -2619,11 +2785,7 @@ class File:
 		g.axes.flat[0].set_title(self.get_graph_title(args, "Performance Pair Grid"), loc='left')
 
 		fig = g.fig
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_pairgrid.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_pairgrid', self._options)
 
 	def graph_pairgrid_kv(self, **kargs):
 		if 'ycsb[0]' not in self._data.keys() or 'performancemonitor' not in self._data.keys():
@@ -2641,19 +2803,18 @@ class File:
 		pairgrid_kargs = {}
 		if args.get('hue') is not None:
 			pairgrid_kargs['hue'] = args['hue']
-		elif 'w' in df.keys() and df['w'].count() > 0:
+		elif 'w' in self.pd_data_columns and df['w'].count() > 0:
 			pairgrid_kargs['hue'] = 'w'
-		if args.get('w') is not None:
-			if isinstance(args['w'], list):
-				df = df.loc[df['w'].isin(args['w'])]
-			else:
-				df = df.loc[df['w'] == args['w']]
 
-		df2 = df.rename(columns=cols)
+		df2 = self.pd_data_renamed(cols, args.get('w'), [pairgrid_kargs.get('hue')])
 
 		g = sns.PairGrid(df2, vars=[v for v in cols.values()], diag_sharey=False, palette='viridis', **pairgrid_kargs)
-		m1 = g.map_upper(sns.scatterplot)
-		m2 = g.map_lower(sns.kdeplot)
+		large = self._options.pairgrid_large_rows is not None and len(df2) > self._options.pairgrid_large_rows
+		m1 = g.map_upper(sns.scatterplot, rasterized=large)
+		if self._options.pairgrid_kde_rows is not None and len(df2) > self._options.pairgrid_kde_rows:
+			m2 = g.map_lower(sns.histplot, bins=50, cbar=False)
+		else:
+			m2 = g.map_lower(sns.kdeplot)
 		g.map_diag(sns.ecdfplot)
 		for ax in [i for i in m1.axes.flat] + [i for i in m2.axes.flat]:
 			ax.grid(which='major', color='#888888', linestyle='--')
@@ -2663,11 +2824,7 @@ class File:
 		g.axes.flat[0].set_title(self.get_graph_title(args, "Performance KV Pair Grid"), loc='left')
 
 		fig = g.fig
-		if self._options.save:
-			for f in self._options.formats:
-				save_name = f'{self._filename_without_ext}_graph_pairgrid_kv.{f}'
-				fig.savefig(save_name, bbox_inches="tight")
-		plt.show()
+		save_and_show(fig, f'{self._filename_without_ext}_graph_pairgrid_kv', self._options)
 
 	def graph_ecdf_grid(self, **kargs):
 		if 'ycsb[0]' not in self._data.keys() or 'performancemonitor' not in self._data.keys():
@@ -2719,17 +2876,13 @@ class File:
 						leg.set_title(args['hue_title'])
 
 				ax.set(xlabel=k, ylabel=None)
-				ax.xaxis.set_minor_locator(AutoMinorLocator(4))
-				ax.yaxis.set_minor_locator(AutoMinorLocator(2))
+				ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(4))
+				ax.yaxis.set_minor_locator(mticker.AutoMinorLocator(2))
 				ax.grid(which='major', color='#CCCCCC', linestyle='--')
 				ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
 			fig.suptitle(self.get_graph_title(args, "ECDF Grid"), y=1.2)
-			if self._options.save:
-				for f in self._options.formats:
-					save_name = f'{self._filename_without_ext}_graph_ecdf_grid.{f}'
-					fig.savefig(save_name, bbox_inches="tight")
-			plt.show()
+			save_and_show(fig, f'{self._filename_without_ext}_graph_ecdf_grid', self._options)
 
 		except Exception as e:
 			print(f'ERROR in graph_ecdf_grid(): {str(e)}')
@@ -2753,12 +2906,22 @@ class File:
 			self._x_tick_major = i
 			self._x_tick_minor = 5
 		if self._x_tick_major is not None:
-			ax.xaxis.set_major_locator(MultipleLocator(self._x_tick_major))
-			ax.xaxis.set_minor_locator(AutoMinorLocator(self._x_tick_minor))
+			ax.xaxis.set_major_locator(mticker.MultipleLocator(self._x_tick_major))
+			ax.xaxis.set_minor_locator(mticker.AutoMinorLocator(self._x_tick_minor))
 			ax.grid(which='major', color='#CCCCCC', linestyle='--')
 			ax.grid(which='minor', color='#CCCCCC', linestyle=':')
 
 	def graph_all(self):
+		options = self._options
+		self._options = pdf_pages_options(options, self._filename_without_ext)
+		try:
+			self._graph_all()
+		finally:
+			if self._options is not options:
+				self._options.pdf_pages.close()
+				self._options = options
+
+	def _graph_all(self):
 		print(f'Graphs from file "{self._filename}":')
 		description = self._filename
 		if self._options.print_params:
@@ -2818,21 +2981,49 @@ class File:
 		if self._options.plot_at3_write_ratio: self.graph_at3_write_ratio()
 
 
-def coalesce(*values):
-	for v in values:
-		if v is not None:
-			return v;
-	return None
+def save_figure(fig, basename: str, formats: list, pdf_pages=None) -> None:
+	"""Save fig as f'{basename}.{format}' for each format, with a tight bounding box.
+	If pdf_pages is given, the pdf format is appended to it as a new page instead.
+
+	The bounding box of the raster formats is computed once with the canvas renderer
+	and shared by them (savefig with bbox_inches="tight" computes it again for each file).
+	Vector formats measure text with their own renderer, so they keep bbox_inches="tight"."""
+	if len(formats) == 0:
+		return
+	raster_bbox = 'tight'
+	pad_inches = mpl.rcParams['savefig.pad_inches']
+	if (isinstance(pad_inches, (int, float))  # not 'layout' (matplotlib >= 3.8)
+			and hasattr(fig.canvas, 'get_renderer') and not _RASTER_FORMATS.isdisjoint(formats)):
+		raster_bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(pad_inches)
+	for f in formats:
+		bbox = raster_bbox if f in _RASTER_FORMATS else 'tight'
+		if f == 'pdf' and pdf_pages is not None:
+			pdf_pages.savefig(fig, bbox_inches=bbox)
+		else:
+			fig.savefig(f'{basename}.{f}', bbox_inches=bbox)
 
 
-def get_recursive(value, *attributes):
-	cur_v = value
-	for i in attributes:
-		try:
-			cur_v = cur_v[i]
-		except:
-			return None
-	return cur_v
+def pdf_pages_options(options, basename: str):
+	"""Return a copy of options whose pdf_pages collects the PDF figures in f'{basename}_graphs.pdf'
+	when options.single_pdf applies. Otherwise, return options itself."""
+	if options.save and options.single_pdf and 'pdf' in options.formats and options.pdf_pages is None:
+		from matplotlib.backends.backend_pdf import PdfPages
+		return options(pdf_pages=PdfPages(f'{basename}_graphs.pdf'))
+	return options
+
+
+def save_and_show(fig, basename: str, options) -> None:
+	"""Save fig when options.save is set, then show it (saved figures are not shown
+	by non-GUI backends such as Agg, so plt.show() is skipped for them).
+
+	Outside matplotlib's interactive mode the figure is closed after plt.show(),
+	so batch runs do not accumulate every figure in pyplot."""
+	if options.save:
+		save_figure(fig, basename, options.formats, options.pdf_pages)
+	if not options.save or mpl.get_backend().lower() not in _NON_GUI_BACKENDS:
+		plt.show()
+	if not mpl.is_interactive():
+		plt.close(fig)
 
 
 def scale(value, divisor):
@@ -2855,49 +3046,51 @@ def try_convert(value, *types):
 	return value
 
 
+@functools.lru_cache(maxsize=1 << 16)
+def _convert_stats_str(value: str):
+	# STATS values are strings that repeat a lot ("0.00", "true", ...)
+	return try_convert(value, int, float, decimal_suffix)
+
+
 def decimal_suffix(value):
-	r = re.findall(r' *([0-9.]+) *([TBMK]) *', value)
-	if len(r) > 0:
-		number = try_convert(r[0][0], int, float)
-		suffix = r[0][1]
-		if   suffix == "K": number = number * 1000
-		elif suffix == "M": number = number * (1000**2)
-		elif suffix == "B": number = number * (1000**3)
-		elif suffix == "T": number = number * (1000**4)
-		return number
+	m = _RE_DECIMAL_SUFFIX.search(value)
+	if m is not None:
+		return try_convert(m[1], int, float) * _DECIMAL_SUFFIXES[m[2]]
 	else:
 		raise Exception("invalid number")
 
 
 def binary_suffix(value):
-	r = re.findall(r' *([0-9.]+) *([PTGMKptgmk])i{0,1}[Bb]{0,1} *', value)
-	if len(r) > 0:
-		number = try_convert(r[0][0], int, float)
-		suffix = r[0][1]
-		if   suffix.upper() == "K": number = number * 1024
-		elif suffix.upper() == "M": number = number * (1024**2)
-		elif suffix.upper() == "G": number = number * (1024**3)
-		elif suffix.upper() == "T": number = number * (1024**4)
-		elif suffix.upper() == "P": number = number * (1024**5)
-		return number
+	m = _RE_BINARY_SUFFIX.search(value)
+	if m is not None:
+		return try_convert(m[1], int, float) * _BINARY_SUFFIXES[m[2].upper()]
 	else:
 		raise Exception("invalid number")
 
 
 def flat_dict(source, prefix=None, ret=None):
-	prefix_add = '' if prefix is None else f'{prefix}.'
-
+	"""Flatten nested dicts and lists into ret as {'key.subkey.0': value}, in source order."""
 	if ret is None:
 		ret = collections.OrderedDict()
-
-	if isinstance(source, dict):
-		for k, v in source.items():
-			flat_dict(v, prefix=f'{prefix_add}{k}', ret=ret)
-	elif isinstance(source, list):
-		for i in range(len(source)):
-			flat_dict(source[i], prefix=f'{prefix_add}{i}', ret=ret)
-	else:
+	if not isinstance(source, (dict, list)):
 		ret[prefix if prefix is not None else 'NONE'] = source
+		return ret
+
+	# stack of (items iterator, key prefix): leaves are stored directly, containers are pushed
+	stack = [(iter(source.items() if isinstance(source, dict) else enumerate(source)),
+	          '' if prefix is None else f'{prefix}.')]
+	while stack:
+		items, prefix_add = stack[-1]
+		for k, v in items:
+			if isinstance(v, dict):
+				stack.append((iter(v.items()), f'{prefix_add}{k}.'))
+				break
+			elif isinstance(v, list):
+				stack.append((iter(enumerate(v)), f'{prefix_add}{k}.'))
+				break
+			ret[f'{prefix_add}{k}'] = v
+		else:
+			stack.pop()
 
 	return ret
 
@@ -2922,6 +3115,205 @@ def rename_drop_prefixes(dataframe, prefix_map={}):
 	return df2
 
 
+def corr_with(dataframe, column):
+	"""Same as dataframe.corr()[column] (Pearson, pairwise complete observations),
+	without computing the correlations among the other columns."""
+	numeric = dataframe.select_dtypes(include=['number', 'bool'])
+	M = numeric.to_numpy(dtype=numpy.float64, na_value=numpy.nan)
+	y = numeric[column].to_numpy(dtype=numpy.float64, na_value=numpy.nan)[:, None]
+	mask = ~numpy.isnan(M) & ~numpy.isnan(y)
+	nobs = mask.sum(axis=0)
+	with numpy.errstate(divide='ignore', invalid='ignore'):
+		Mm = numpy.where(mask, M, 0.)
+		ym = numpy.where(mask, y, 0.)
+		dx = numpy.where(mask, Mm - Mm.sum(axis=0) / nobs, 0.)
+		dy = numpy.where(mask, ym - ym.sum(axis=0) / nobs, 0.)
+		divisor = numpy.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+		ret = numpy.where((nobs > 0) & (divisor != 0), (dx * dy).sum(axis=0) / divisor, numpy.nan)
+	return pd.Series(ret, index=numeric.columns, name=column)
+
+
+def ecdf(values):
+	"""Sorted values (NaN excluded) and their cumulative proportions."""
+	x = numpy.sort(numpy.asarray(values, dtype=numpy.float64))
+	x = x[~numpy.isnan(x)]
+	return x, numpy.arange(1, len(x) + 1) / len(x)
+
+
+def ecdfplot(ax, data, x, hue=None, legend=True):
+	"""Draw the same lines as sns.ecdfplot(ax=ax, data=data, x=x, hue=hue), with one ax.plot per hue level."""
+	if hue is not None and pd.api.types.is_numeric_dtype(data[hue]):
+		# numeric hues are mapped to a colormap by seaborn
+		sns.ecdfplot(ax=ax, data=data, x=x, hue=hue, legend=legend)
+		return
+	if hue is None:
+		groups, colors = [(None, data[x])], [None]
+	else:
+		hue_values = data[hue]
+		if isinstance(hue_values.dtype, pd.CategoricalDtype):
+			levels = list(hue_values.cat.categories)
+		else:
+			levels = [v for v in pd.unique(hue_values) if not pd.isna(v)]
+		n_colors = len(levels)
+		colors = sns.color_palette(n_colors=n_colors) if n_colors <= len(sns.color_palette()) \
+		         else sns.color_palette('husl', n_colors)
+		groups = [(l, data.loc[hue_values == l, x]) for l in levels]
+	for (level, values), color in reversed(list(zip(groups, colors))):
+		X, Y = ecdf(values)
+		if len(X) == 0:
+			continue
+		line, = ax.plot(numpy.r_[-numpy.inf, X], numpy.r_[0., Y], drawstyle='steps-post', color=color)
+		line.sticky_edges.y[:] = 0, 1
+	ax.set(xlabel=x, ylabel='Proportion')
+	if hue is not None and legend:
+		handles = [mpl.lines.Line2D([], [], color=c) for c in colors]
+		ax.legend(handles, [str(l) for l in levels], title=hue)
+
+
+def kde(values, grid, bins: int = 1024):
+	"""Gaussian KDE (Scott's bandwidth) of values evaluated on grid.
+
+	The values are binned first, so the cost is O(len(grid) * bins) instead of
+	O(len(grid) * len(values))."""
+	values = numpy.asarray(values, dtype=float)
+	bw = values.std(ddof=1) * values.size ** (-1. / 5.)
+	counts, edges = numpy.histogram(values, bins=bins)
+	centers = (edges[:-1] + edges[1:]) / 2.
+	z = (grid[:, None] - centers[None, :]) / bw
+	return numpy.exp(-0.5 * z * z) @ counts / (values.size * bw * numpy.sqrt(2. * numpy.pi))
+
+
+def violinplot(ax, data, y, x=None, min_samples: int = 10, gridsize: int = 128, cut: float = 2.):
+	"""Draw violins similar to sns.violinplot(ax=ax, data=data, y=y, x=x), from one KDE per group.
+
+	Groups with less than min_samples values get only the inner box."""
+	if x is None:
+		levels, groups = [None], [data[y].dropna()]
+	else:
+		x_values = data[x]
+		if isinstance(x_values.dtype, pd.CategoricalDtype):
+			levels = list(x_values.cat.categories)
+		else:
+			levels = [v for v in pd.unique(x_values) if not pd.isna(v)]
+			if pd.api.types.is_numeric_dtype(x_values):
+				levels = sorted(levels)
+		groups = [data.loc[x_values == l, y].dropna() for l in levels]
+	n_colors = len(levels)
+	colors = sns.color_palette(n_colors=n_colors) if n_colors <= len(sns.color_palette()) \
+	         else sns.color_palette('husl', n_colors)
+	colors = [sns.desaturate(c, .75) for c in colors]
+	lum = min(colorsys.rgb_to_hls(*c)[1] for c in colors) * .6
+	gray = mpl.colors.rgb2hex((lum, lum, lum))
+	lw = mpl.rcParams['lines.linewidth']
+
+	densities = []
+	for values in groups:
+		v = values.to_numpy(dtype=float)
+		if v.size < min_samples or v.std() == 0:
+			densities.append(None)
+			continue
+		bw = v.std(ddof=1) * v.size ** (-1. / 5.)
+		grid = numpy.linspace(v.min() - cut * bw, v.max() + cut * bw, gridsize)
+		densities.append((grid, kde(v, grid)))
+	max_density = max([d.max() for _, d in filter(None, densities)], default=1.)
+
+	for i, (values, density, color) in enumerate(zip(groups, densities, colors)):
+		if density is not None:
+			grid, d = density
+			d = d / max_density * .4
+			ax.fill_betweenx(grid, i - d, i + d, facecolor=color, edgecolor=gray, linewidth=lw)
+		if len(values) == 0:
+			continue
+		q25, q50, q75 = numpy.percentile(values, [25, 50, 75])
+		whisker = 1.5 * (q75 - q25)
+		low = values[values >= q25 - whisker].min()
+		high = values[values <= q75 + whisker].max()
+		ax.plot([i, i], [low, high], color=gray, linewidth=lw)
+		ax.plot([i, i], [q25, q75], color=gray, linewidth=lw * 3)
+		ax.scatter(i, q50, zorder=3, color='white', edgecolor=gray, s=numpy.square(lw * 2))
+
+	ax.set_xticks(range(len(levels)))
+	ax.set_xticklabels(['' if l is None else str(l) for l in levels])
+	ax.set_xlim(-.5, len(levels) - .5)
+	ax.xaxis.grid(False)
+	ax.set(xlabel=x, ylabel=y)
+
+
+def _lttb_indices(x, y, n_out: int):
+	"""Indices of the n_out points kept by Largest-Triangle-Three-Buckets (first and last are always kept)."""
+	n = len(x)
+	if n_out >= n or n_out < 3:
+		return numpy.arange(n)
+	edges = numpy.linspace(1, n - 1, n_out - 1).astype(int)
+	ret = numpy.empty(n_out, dtype=int)
+	ret[0], ret[-1] = 0, n - 1
+	a = 0
+	for b in range(n_out - 2):
+		lo, hi = edges[b], edges[b + 1]
+		# average of the next bucket (the last point for the last bucket)
+		n_lo, n_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+		cx, cy = x[n_lo:n_hi].mean(), y[n_lo:n_hi].mean()
+		area = numpy.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+		a = lo + int(area.argmax())
+		ret[b + 1] = a
+	return ret
+
+
+def downsample(x, y, n_out):
+	"""Reduce the series (x, y) to about n_out points with LTTB, for plotting.
+
+	NaN gaps are kept: each finite run is reduced separately and the runs are
+	joined by one NaN point. Series with up to n_out points, or an n_out that is
+	not a positive number (None, False, 0), are returned as is."""
+	x = numpy.asarray(x, dtype=float)
+	y = numpy.asarray(y, dtype=float)
+	if not n_out or n_out <= 0 or len(x) <= n_out:
+		return x, y
+	finite = numpy.isfinite(y)
+	if finite.all():
+		idx = _lttb_indices(x, y, n_out)
+		return x[idx], y[idx]
+	# boundaries of the finite runs
+	changes = numpy.flatnonzero(numpy.diff(numpy.r_[False, finite, False].astype(int)))
+	runs = changes.reshape(-1, 2)
+	n_finite = int(finite.sum())
+	xs, ys = [], []
+	for start, end in runs:
+		if len(xs) > 0:
+			xs.append([x[start - 1]])
+			ys.append([numpy.nan])
+		run_out = max(3, int(round(n_out * (end - start) / n_finite)))
+		idx = start + _lttb_indices(x[start:end], y[start:end], run_out)
+		xs.append(x[idx])
+		ys.append(y[idx])
+	if len(xs) == 0:
+		return x[:0], y[:0]
+	return numpy.concatenate(xs), numpy.concatenate(ys)
+
+
+def _bucket_ranks(r):
+	"""Map rank percentiles to quartiles (0.25, 0.5, 0.75, 1.0). NaN goes to 1.0."""
+	return numpy.take([0.25, 0.5, 0.75, 1.0], numpy.digitize(r, [0.26, 0.51, 0.76]))
+
+
+def _bucket_ranks_loop(r):
+	out = numpy.empty_like(r)
+	for i in range(r.size):
+		x = r[i]
+		out[i] = 0.25 if x < 0.26 else 0.5 if x < 0.51 else 0.75 if x < 0.76 else 1.0
+	return out
+
+
+_bucket_ranks_jit = njit(cache=True)(_bucket_ranks_loop) if njit is not None else None
+
+
+def annotation_indices(n: int, max_n) -> list:
+	"""Indices of the n points to be labeled: all of them, or max_n evenly spaced ones."""
+	if max_n is None or n <= max_n:
+		return list(range(n))
+	return numpy.unique(numpy.linspace(0, n - 1, max_n, dtype=int)).tolist()
+
+
 def join_time(t, time_set, max_range):
 	if isinstance(t, int):
 		if t in time_set:
@@ -2934,7 +3326,22 @@ def join_time(t, time_set, max_range):
 			c += 1
 		return None
 	elif hasattr(t, '__iter__'):
-		return [join_time(i, time_set, max_range) for i in t]
+		t_array = numpy.asarray(t)
+		if t_array.ndim != 1 or t_array.dtype.kind not in 'iu':
+			return [join_time(i, time_set, max_range) for i in t]
+		# vectorized form: nearest time within max_range, the lower one on ties
+		times = time_set if isinstance(time_set, numpy.ndarray) else numpy.array(sorted(time_set))
+		if len(times) == 0:
+			return [None] * len(t_array)
+		idx = numpy.searchsorted(times, t_array)
+		lower = times[numpy.maximum(idx - 1, 0)]
+		upper = times[numpy.minimum(idx, len(times) - 1)]
+		dist_lower = numpy.where(idx > 0, t_array - lower, numpy.iinfo(numpy.int64).max)
+		dist_upper = numpy.where(idx < len(times), upper - t_array, numpy.iinfo(numpy.int64).max)
+		use_upper = dist_upper < dist_lower
+		ret = numpy.where(use_upper, upper, lower).tolist()
+		found = (numpy.where(use_upper, dist_upper, dist_lower) <= max(max_range, 0)).tolist()
+		return [r if f else None for r, f in zip(ret, found)]
 	else:
 		print('ERROR in join_time: t is neither int nor iterable')
 		return None
@@ -3015,13 +3422,39 @@ def getFiles(dirname: str, str_filter: str = None, list_filter: list = None, lam
 	return sort_method(files)
 
 
+def _plot_file(name, options):
+	File(name, options).graph_all()
+
+
+def _picklable(obj) -> bool:
+	try:
+		pickle.dumps(obj)
+		return True
+	except Exception:
+		return False
+
+
 def plotFiles(filenames, options, allfiles=None):
 	if isinstance(allfiles, str):
 		allfiles = AllFiles(allfiles, options)
 	if allfiles is None:
-		for name in filenames:
-			f = File(name, options)
-			f.graph_all()
+		workers = min(options.file_workers or 1, len(filenames))
+		if workers > 1 and not _picklable(options):  # e.g., lambdas in after_pd_data
+			print('WARN: options cannot be sent to worker processes, plotting the files sequentially')
+			workers = 1
+		if workers > 1 and options.save and not mpl.is_interactive():
+			# errors are raised in file order, as in the sequential loop; pending files are cancelled
+			with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+				futures = [executor.submit(_plot_file, name, options) for name in filenames]
+				try:
+					for future in futures:
+						future.result()
+				except BaseException:
+					executor.shutdown(cancel_futures=True)
+					raise
+		else:
+			for name in filenames:
+				_plot_file(name, options)
 	else:
 		for name in filenames:
 			allfiles.add_file(name)
@@ -3039,34 +3472,46 @@ class FioFiles:
 		self._files = []
 		self._data = []
 
-		for f in files:
-			self.parseFile(f)
-
-		self._pd = pd.DataFrame({
-			"rw":           [i['jobs'][0]['job options']['rw']                         for i in self._data],
-			"iodepth":      [try_convert(i['jobs'][0]['job options']['iodepth'], int) for i in self._data],
-			"bs":           [binary_suffix(i['jobs'][0]['job options']['bs']) for i in self._data],
-			"error":        [try_convert(i['jobs'][0]['error'], bool) for i in self._data],
-			"bw_min":       [i['jobs'][0]['mixed']['bw_min']                           for i in self._data],
-			"bw_max":       [i['jobs'][0]['mixed']['bw_max']                           for i in self._data],
-			"bw_agg":       [i['jobs'][0]['mixed']['bw_agg']                           for i in self._data],
-			"bw_mean":      [i['jobs'][0]['mixed']['bw_mean']                          for i in self._data],
-			"bw_dev":       [i['jobs'][0]['mixed']['bw_dev']                           for i in self._data],
-			"iops_min":     [i['jobs'][0]['mixed']['iops_min']                         for i in self._data],
-			"iops_max":     [i['jobs'][0]['mixed']['iops_max']                         for i in self._data],
-			"iops_mean":    [i['jobs'][0]['mixed']['iops_mean']                        for i in self._data],
-			"iops_stddev":  [i['jobs'][0]['mixed']['iops_stddev']                      for i in self._data],
-			"iops_samples": [i['jobs'][0]['mixed']['iops_samples']                     for i in self._data],
-			})
+		files = list(files)
+		if len(files) > 1:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(files))) as executor:
+				parsed = list(executor.map(self._load_file, files))
+		else:
+			parsed = [self._load_file(f) for f in files]
+		for f, j in parsed:
+			if j is not None:
+				self._files.append(f)
+				self._data.append(j)
 
-	def parseFile(self, filename):
+		mixed_keys = ['bw_min', 'bw_max', 'bw_agg', 'bw_mean', 'bw_dev',
+		              'iops_min', 'iops_max', 'iops_mean', 'iops_stddev', 'iops_samples']
+		cols = {k: [] for k in ['rw', 'iodepth', 'bs', 'error'] + mixed_keys}
+		for i in self._data:
+			job = i['jobs'][0]
+			job_options, mixed = job['job options'], job['mixed']
+			cols['rw'].append(job_options['rw'])
+			cols['iodepth'].append(try_convert(job_options['iodepth'], int))
+			cols['bs'].append(binary_suffix(job_options['bs']))
+			cols['error'].append(try_convert(job['error'], bool))
+			for k in mixed_keys:
+				cols[k].append(mixed[k])
+		self._pd = pd.DataFrame(cols)
+		self._pd['rw'] = self._pd['rw'].astype('category')
+
+	@staticmethod
+	def _load_file(filename):
 		try:
-			with open(filename, "r") as f:
-				j = json.load(f)
-				self._files.append(filename)
-				self._data.append(j)
+			with open(filename, "rb") as f:
+				return filename, _json_loads(f.read())
 		except Exception as e:
 			print("ERROR: failed to read file {}: {}".format(filename, str(e)))
+			return filename, None
+
+	def parseFile(self, filename):
+		filename, j = self._load_file(filename)
+		if j is not None:
+			self._files.append(filename)
+			self._data.append(j)
 
 	def sortPatterns(self, patterns):
 		ret = []
@@ -3077,97 +3522,70 @@ class FioFiles:
 			if p not in desired_order: ret.append(p)
 		return ret
 
-	def graph_bw(self):
-		pattern_list = self.sortPatterns(self._pd['rw'].value_counts().index)
-		for pattern in pattern_list:
+	_pattern_list = None
+	@property
+	def pattern_list(self) -> list:
+		"""fio access patterns (rw) in graph order."""
+		if self._pattern_list is None:
+			self._pattern_list = self.sortPatterns(self._pd['rw'].cat.categories)
+		return self._pattern_list
+
+	_pattern_tables = None
+	def pattern_table(self, pattern):
+		"""(iodepth_list, bs_list, table) of an access pattern, built once. The table holds the mean and
+		deviation stats of each (iodepth, bs) pair, with rows by iodepth and columns by (stat, bs)."""
+		if self._pattern_tables is None: self._pattern_tables = dict()
+		ret = self._pattern_tables.get(pattern)
+		if ret is None:
 			pattern_pd = self._pd[self._pd['rw'] == pattern]
-			iodepth_list = list(pattern_pd['iodepth'].value_counts().index)
-			iodepth_list.sort()
-			X_values = list(pattern_pd['bs'].value_counts().index)
-			X_values.sort()
-			#print(X_values)
-
-			fig, ax = plt.subplots()
-			fig.set_figheight(4)
-			fig.set_figwidth(9.8)
-
-			X_labels = [ str(int(x/1024)) for x in X_values]
-			#print(X_labels)
-
-			Y_max = 0
-			width=0.07
-			s_width=0.0-((width * len(iodepth_list))/2)
-			for iodepth in iodepth_list:
-				X = [ x+s_width for x in range(0,len(X_values)) ]
-				#print(X)
-				Y = [ float(pattern_pd[(pattern_pd['iodepth']==iodepth)&(pattern_pd['bs']==x)]['bw_mean']) for x in X_values ]
-				Y_dev = [ float(pattern_pd[(pattern_pd['iodepth']==iodepth)&(pattern_pd['bs']==x)]['bw_dev']) for x in X_values ]
-				#print(Y)
-				label = f'iodepth {iodepth}' if iodepth == 1 else f'{iodepth}'
-				ax.bar(X, Y, yerr=Y_dev, label=label, width=width)
-				Y_max = max([ Y_max, max(numpy.array(Y) + numpy.array(Y_dev)) ])
-				s_width += width
-
-			ax.set_xticks([ x for x in range(0, len(X_labels))])
-			ax.set_xticklabels(X_labels)
-
-			ax.set_ylim([0, Y_max * 1.2])
-
-			ax.set(title="fio {}".format(pattern), xlabel="block size (KiB)", ylabel="KiB/s")
-			ax.legend(loc='upper left', ncol=8, frameon=False)
+			iodepth_list = sorted(pattern_pd['iodepth'].unique())
+			bs_list = sorted(pattern_pd['bs'].unique())
+			table = pattern_pd.pivot_table(index='iodepth', columns='bs',
+			                               values=['bw_mean', 'bw_dev', 'iops_mean', 'iops_stddev'], dropna=False)
+			ret = (iodepth_list, bs_list, table)
+			self._pattern_tables[pattern] = ret
+		return ret
 
-			if self._options.save:
-				folder = f'{self._options.fio_folder}/' if self._options.fio_folder is not None else ''
-				for f in self._options.formats:
-					save_name = f'{folder}fio_bw_{pattern}.{f}'
-					fig.savefig(save_name, bbox_inches="tight")
-			plt.show()
+	def graph_bw(self):
+		self._graph_bars('bw_mean', 'bw_dev', 'KiB/s', 'fio_bw')
 
 	def graph_iops(self):
-		pattern_list = self.sortPatterns(self._pd['rw'].value_counts().index)
-		for pattern in pattern_list:
-			pattern_pd = self._pd[self._pd['rw'] == pattern]
-			iodepth_list = list(pattern_pd['iodepth'].value_counts().index)
-			iodepth_list.sort()
-			X_values = list(pattern_pd['bs'].value_counts().index)
-			X_values.sort()
-			#print(X_values)
+		self._graph_bars('iops_mean', 'iops_stddev', 'IOPS', 'fio_iops')
+
+	def _graph_bars(self, mean_col, dev_col, ylabel, file_prefix):
+		for pattern in self.pattern_list:
+			iodepth_list, X_values, table = self.pattern_table(pattern)
+			Y_all = table[mean_col].reindex(index=iodepth_list, columns=X_values)
+			Y_dev_all = table[dev_col].reindex(index=iodepth_list, columns=X_values)
 
 			fig, ax = plt.subplots()
 			fig.set_figheight(4)
 			fig.set_figwidth(9.8)
 
-			X_labels = [ str(int(x/1024)) for x in X_values ]
-			#print(X_labels)
+			indexes = numpy.arange(len(X_values))
+			X_labels = (numpy.asarray(X_values) / 1024).astype(int).astype(str)
 
-			Y_max = 0
 			width=0.07
-			s_width=0.0-((width * len(iodepth_list))/2)
-			for iodepth in iodepth_list:
-				X = [ x+s_width for x in range(0,len(X_values)) ]
-				#print(X)
-				Y = [ float(pattern_pd[(pattern_pd['iodepth']==iodepth)&(pattern_pd['bs']==x)]['iops_mean']) for x in X_values ]
-				Y_dev = [ float(pattern_pd[(pattern_pd['iodepth']==iodepth)&(pattern_pd['bs']==x)]['iops_stddev']) for x in X_values ]
-				#print(Y)
-				label = f'iodepth {iodepth}' if iodepth == 1 else f'{iodepth}'
-				ax.bar(X, Y, yerr=Y_dev, label=label, width=width)
-				Y_max = max([ Y_max, max(numpy.array(Y) + numpy.array(Y_dev)) ])
-				s_width += width
-
-			ax.set_xticks([ x for x in range(0, len(X_labels))])
+			offsets = width * numpy.arange(len(iodepth_list)) - (width * len(iodepth_list)) / 2
+			colors = [c['color'] for c, _ in zip(itertools.cycle(mpl.rcParams['axes.prop_cycle']), iodepth_list)]
+			Y = Y_all.to_numpy()
+			Y_dev = Y_dev_all.to_numpy()
+			bars = ax.bar(numpy.add.outer(offsets, indexes).ravel(), Y.ravel(), yerr=Y_dev.ravel(),
+			              width=width, color=[c for c in colors for _ in X_values])
+			handles = bars.patches[::len(X_values)]
+			labels = [f'iodepth {iodepth}' if iodepth == 1 else f'{iodepth}' for iodepth in iodepth_list]
+			Y_max = numpy.nanmax(Y + Y_dev, initial=0)
+
+			ax.set_xticks(indexes)
 			ax.set_xticklabels(X_labels)
 
 			ax.set_ylim([0, Y_max * 1.2])
 
-			ax.set(title="fio {}".format(pattern), xlabel="block size (KiB)", ylabel="IOPS")
-			ax.legend(loc='upper left', ncol=8, frameon=False)
+			ax.set(title="fio {}".format(pattern), xlabel="block size (KiB)", ylabel=ylabel)
+			ax.legend(handles, labels, loc='upper left', ncol=8, frameon=False)
 
-			if self._options.save:
-				folder = f'{self._options.fio_folder}/' if self._options.fio_folder is not None else ''
-				for f in self._options.formats:
-					save_name = f'{folder}fio_iops_{pattern}.{f}'
-					fig.savefig(save_name, bbox_inches="tight")
-			plt.show()
+			folder = f'{self._options.fio_folder}/' if self._options.fio_folder is not None else ''
+			save_and_show(fig, f'{folder}{file_prefix}_{pattern}', self._options)
 
 
 ##############################################################################
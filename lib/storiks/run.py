@@ -15,18 +15,69 @@ import os
 import socket
 import shlex
 
+def _socket_send(sockpath, cmd, read_all=False):
+	"""Send cmd to the unix socket sockpath and return its answer.
+	With read_all, the answer is read until the server closes the connection."""
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+		sock.connect(sockpath)
+		sock.sendall(cmd.encode())
+		if not read_all:
+			return sock.recv(4 * 1024 ** 2).decode()
+		data = bytearray()
+		while True:
+			chunk = sock.recv(64 * 1024)
+			if not chunk:
+				return data.decode()
+			data += chunk
+
+def _storiksd_socket():
+	comm_dir = os.getenv("STORIKS_COMMUNICATION_DIR")
+	if comm_dir is None:
+		raise Exception('undefined environment variable STORIKS_COMMUNICATION_DIR')
+	return os.path.join(comm_dir, 'storiksd.socket')
+
 def _storiksd_send(cmd):
 	"""Send a command to storiks daemon (storiksd)."""
-	comm_dir = os.getenv("STORIKS_COMMUNICATION_DIR")
-	if comm_dir is not None:
-		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-		sock.connect(os.path.join(comm_dir, 'storiksd.socket'))
+	return _socket_send(_storiksd_socket(), cmd, read_all=True)  # storiksd closes one-shot connections after answering
 
-		sock.sendall(bytes(cmd, 'utf-8'))
-		return str(sock.recv(4 * 1024 ** 2), 'utf-8')
+class StoriksdClient:
+	"""Persistent connection to storiks daemon (storiksd), for scripts sending many commands.
 
-	else:
-		raise Exception('undefined environment variable STORIKS_COMMUNICATION_DIR')
+	Example:
+		with StoriksdClient() as client:
+			print(client.send('status 3'))
+			print(client.send('cancel 3'))
+	"""
+	def __init__(self, sockpath=None):
+		self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			self._sock.connect(sockpath if sockpath is not None else _storiksd_socket())
+			self._file = self._sock.makefile('rwb')
+			self.send('session')
+		except:
+			self._sock.close()
+			raise
+
+	def send(self, cmd):
+		"""Send a command to storiksd and return its answer."""
+		if '\n' in cmd:
+			raise ValueError('commands cannot contain line breaks')
+		self._file.write(f'{cmd}\n'.encode())
+		self._file.flush()
+		header = self._file.readline()
+		if not header:
+			raise ConnectionError('connection closed by storiksd')
+		return self._file.read(int(header)).decode()
+
+	def close(self):
+		self._file.close()
+		self._sock.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
 
 send = _storiksd_send
 
@@ -43,15 +94,12 @@ def _storiks_send(cmd):
 	with open(pathfile, 'rt') as f:
 		sockpath = f.readline().strip()
 		# print(f'DEBUG: sockpath={sockpath}')
-		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-		sock.connect(sockpath)
-		sock.sendall(bytes(cmd, 'utf-8'))
-		return str(sock.recv(4 * 1024 ** 2), 'utf-8')
+	return _socket_send(sockpath, cmd)
 
 def send_exp(cmd):
 	print(_storiks_send(cmd))
 
-def list():
+def list_cmds():
 	"""Send the command "list" to storiksd.
 	Print the list of commands scheduled in storiksd.
 
@@ -97,3 +145,9 @@ def schedule(cmd, output=None, append=False, overwrite=False, compress=False, wo
 	prefix_cmd += ['--workdir', workdir]
 	ret = _storiksd_send(f'{shlex.join(prefix_cmd)} {cmd}')
 	print(ret)
+
+def __getattr__(name):
+	# run.list() is kept for existing notebooks without shadowing the list builtin in this module
+	if name == 'list':
+		return list_cmds
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
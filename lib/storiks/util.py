@@ -13,6 +13,7 @@ LICENSE.GPLv2 file in the root directory) and Apache 2.0 License
 
 import os
 import sys
+import queue
 import socketserver
 import threading
 
@@ -23,48 +24,58 @@ def coalesce(*values):
 	return None
 
 def getenv_default(envname, default):
-	ev = os.getenv(envname)
+	ev = os.environ.get(envname)
 	return coalesce(ev, default)
 
+_MISSING = object()
+
 def get_recursive(value, *attributes):
-	cur_v = value
-	for i in attributes:
-		try:
-			cur_v = cur_v[i]
-		except:
-			return None
-	return cur_v
+	try:
+		for i in attributes:
+			if isinstance(value, dict):  # missing keys are common: avoid raising KeyError
+				value = value.get(i, _MISSING)
+				if value is _MISSING:
+					return None
+			else:
+				value = value[i]
+		return value
+	except (KeyError, IndexError, TypeError, AttributeError):
+		return None
+
+_TRUE_VALUES = frozenset(['1', 't', 'true', 'y', 'yes'])
+_FALSE_VALUES = frozenset(['0', 'f', 'false', 'n', 'no'])
 
 def env_as_bool(envname, not_found=False, default=False, invalid=False):
-	ev = os.getenv(envname)
+	ev = os.environ.get(envname)
 	if ev is None:
 		return not_found
 	ev = ev.strip().lower()
 	if ev == '':
 		return default
-	if ev in ['1', 't', 'true', 'y', 'yes']:
+	if ev in _TRUE_VALUES:
 		return True
-	if ev in ['0', 'f', 'false', 'n', 'no']:
+	if ev in _FALSE_VALUES:
 		return False
 	return invalid
 
 
 # =============================================================================
 class FakeLog:
+	"""Minimal stand-in for logging.Logger. Like logging, msg % args is only formatted when emitted."""
 	debug_active = False
 	@classmethod
-	def debug(cls, msg):
+	def debug(cls, msg, *args):
 		if (cls.debug_active):
-			sys.stderr.write(f'DEBUG: {msg}\n')
+			sys.stderr.write(f'DEBUG: {msg % args if args else msg}\n')
 	@classmethod
-	def info(cls, msg):
-		sys.stderr.write(f'INFO: {msg}\n')
+	def info(cls, msg, *args):
+		sys.stderr.write(f'INFO: {msg % args if args else msg}\n')
 	@classmethod
-	def warning(cls, msg):
-		sys.stderr.write(f'WARN: {msg}\n')
+	def warning(cls, msg, *args):
+		sys.stderr.write(f'WARN: {msg % args if args else msg}\n')
 	@classmethod
-	def error(cls, msg):
-		sys.stderr.write(f'ERROR: {msg}\n')
+	def error(cls, msg, *args):
+		sys.stderr.write(f'ERROR: {msg % args if args else msg}\n')
 
 # =============================================================================
 class SocketServer:
@@ -74,8 +85,45 @@ class SocketServer:
 	_server_thread = None
 
 	# https://docs.python.org/3/library/socketserver.html
-	class ThreadedServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
-		pass
+	class ThreadedServer(socketserver.UnixStreamServer):
+		"""Handle connections in a fixed set of daemon worker threads instead of one new thread per connection.
+
+		When every worker is busy (e.g., held by persistent storiksd sessions), the connection gets its own
+		thread, so it never waits for another connection to close.
+		"""
+		workers = 16  # pooled threads; connections beyond this run in extra threads
+
+		def __init__(self, *args, **kargs):
+			super().__init__(*args, **kargs)
+			self._requests = queue.SimpleQueue()
+			self._idle_lock = threading.Lock()
+			self._idle = self.workers
+			for i in range(self.workers):
+				threading.Thread(name=f'{self.server_address}.worker{i}', target=self._worker, daemon=True).start()
+
+		def _handle_request(self, request, client_address):
+			try:
+				self.finish_request(request, client_address)
+			except Exception:
+				self.handle_error(request, client_address)
+			finally:
+				self.shutdown_request(request)
+
+		def _worker(self):
+			while True:
+				request, client_address = self._requests.get()
+				self._handle_request(request, client_address)
+				with self._idle_lock:
+					self._idle += 1
+
+		def process_request(self, request, client_address):
+			with self._idle_lock:
+				if self._idle > 0:
+					self._idle -= 1
+					self._requests.put((request, client_address))
+					return
+			threading.Thread(name=f'{self.server_address}.extra', target=self._handle_request,
+			                 args=(request, client_address), daemon=True).start()
 
 	class ThreadedRequestHandler(socketserver.BaseRequestHandler):
 		_handler_method = None
@@ -96,7 +144,7 @@ class SocketServer:
 		self._server_thread.daemon = True
 		log.info(f'Starting {self.__class__.__name__} {filename}')
 		self._server_thread.start()
-		log.debug(f'{self.__class__.__name__} started')
+		log.debug('%s started', self.__class__.__name__)
 
 		if chown is not None:
 			os.chown(filename, chown[0], chown[1])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Run with: python -m unittest discover -s lib/tests"""
+
+import os
+import sys
+import unittest
+import unittest.mock
+
+import numpy
+
+import matplotlib
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import storiks.plot as plot
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'examples', 'examples')
+EXP_AT3 = os.path.join(EXAMPLES, 'exp_02-ycsb_workloadb-pressure_iodepth_n1bs4rr100wr000.out.xz')
+
+
+class TestPlotNothing(unittest.TestCase):
+	def test_plot_nothing_keeps_max_graph_points(self):
+		options = plot.Options(plot_nothing=True)
+		self.assertEqual(options.max_graph_points, plot.Options.max_graph_points)
+		self.assertFalse(options.plot_at3)
+
+	def test_downsample_without_budget(self):
+		x = numpy.arange(100, dtype=float)
+		y = numpy.sin(x)
+		y[40:50] = numpy.nan
+		for n_out in [None, False, 0, -1]:
+			rx, ry = plot.downsample(x, y, n_out)
+			self.assertEqual(len(rx), len(x))
+			numpy.testing.assert_array_equal(ry, y)
+		self.assertLess(len(plot.downsample(x, y, 20)[0]), len(x))
+
+	@unittest.skipUnless(os.path.exists(EXP_AT3), 'example experiment not found')
+	def test_graph_at3_with_plot_nothing(self):
+		figures = []
+		f = plot.File(EXP_AT3, plot.Options(plot_nothing=True))
+		with unittest.mock.patch.object(plot, 'save_and_show', lambda fig, *args: figures.append(fig)):
+			f.graph_at3()
+		self.assertGreater(len(figures), 0)
+		for fig in figures:
+			for ax in fig.axes:
+				for line in ax.get_lines():
+					if len(line.get_xdata()) > 1:
+						self.assertGreater(len(line.get_xdata()), 3)
+
+
+if __name__ == '__main__':
+	unittest.main()